@@ -6,6 +6,7 @@ from pathlib import Path
 import threading
 import time
 import os
+from audio_stream import CaptureSink, transcode_to_flac, map_wav_pcm
 
 class ALSARecorder:
     """Audio-Recorder der ALSA direkt verwendet (arecord)"""
@@ -25,6 +26,16 @@ class ALSARecorder:
         self._silence_duration = 0.0
         self._silence_start_time = None
         self._silence_stop_triggered = False
+        self.use_pipe = True  # arecord schreibt Roh-PCM nach stdout statt in eine WAV-Datei
+        self.block_frames = 4096  # Blockgröße des PCM-Readers
+        self.flac_path = None
+        self._sink = None
+        self._reader_thread = None
+        self._reader_error = None
+        self._stop_lock = threading.Lock()
+        self.splitter = None  # TrackSplitter für die Split-Erkennung während der Aufnahme
+        self.split_points = []  # Vorläufige Split-Punkte (Sekunden) der laufenden Aufnahme
+        self.on_auto_stop = None  # Callback für Auto-Stop (startet den Finalize-Job der App)
         
     def get_alsa_devices(self):
         """Liste verfügbarer ALSA-Geräte"""
@@ -147,11 +158,44 @@ class ALSARecorder:
             except Exception:
                 time.sleep(0.1)
     
+    def _read_pcm(self):
+        """Lese Roh-PCM aus arecord-stdout in festen Blöcken und speise den CaptureSink"""
+        frame_bytes = self.channels * 2  # S16_LE
+        block_bytes = self.block_frames * frame_bytes
+        pending = b''
+        stdout = self.process.stdout
+        try:
+            while True:
+                data = stdout.read(block_bytes)
+                if not data:
+                    break
+                pending += data
+                # Nur vollständige Frames verarbeiten, Rest für den nächsten Block aufheben
+                usable = len(pending) - len(pending) % frame_bytes
+                if usable < block_bytes and self._is_recording:
+                    continue
+                block = np.frombuffer(pending[:usable], dtype='<i2').reshape(-1, self.channels)
+                pending = pending[usable:]
+                self._sink.process(block)
+                self.current_level = self._sink.current_level
+            
+            # Rest nach Prozessende verarbeiten
+            usable = len(pending) - len(pending) % frame_bytes
+            if usable:
+                self._sink.process(np.frombuffer(pending[:usable], dtype='<i2').reshape(-1, self.channels))
+        except Exception as e:
+            self._reader_error = e
+            print(f"Fehler beim Lesen der PCM-Daten: {e}")
+    
     def _stop_due_to_silence(self):
         """Stoppe Aufnahme aufgrund von Stille"""
         try:
             print(f"📢 Automatisches Stoppen nach {self.auto_stop_silence_seconds}s Stille (Level unter -50 dB)")
-            self.stop_recording()
+            if self.on_auto_stop is not None:
+                # Gleicher Weg wie der Stopp-Button: Finalisieren, Splitten, Status
+                self.on_auto_stop()
+            else:
+                self.stop_recording()
         except Exception as e:
             print(f"Fehler beim Stoppen aufgrund von Stille: {e}")
     
@@ -184,6 +228,7 @@ class ALSARecorder:
         self._silence_duration = 0.0
         self._silence_start_time = None
         self._silence_stop_triggered = False
+        self.split_points = []
         
         # Generiere Dateinamen
         if filename_template:
@@ -193,6 +238,7 @@ class ALSARecorder:
             self.filename = f"recording_{timestamp}.wav"
         
         self.output_path = output_dir / self.filename
+        self.flac_path = self.output_path.parent / (self.output_path.stem + ".flac")
         temp_wav = self.output_path
         
         # Stelle sicher, dass das Verzeichnis existiert
@@ -205,13 +251,26 @@ class ALSARecorder:
                 '-D', self.alsa_device,
                 '-f', 'S16_LE',  # 16-bit signed little-endian
                 '-r', str(self.sample_rate),
-                '-c', str(self.channels),
-                '-t', 'wav',
-                str(temp_wav)
+                '-c', str(self.channels)
             ]
+            if self.use_pipe:
+                # Ohne Dateiname schreibt arecord Roh-PCM nach stdout
+                cmd += ['-t', 'raw']
+                self._reader_error = None
+                self._sink = CaptureSink(
+                    self.flac_path,
+                    self.sample_rate,
+                    self.channels,
+                    auto_stop_silence_seconds=self.auto_stop_silence_seconds,
+                    on_silence=lambda: threading.Thread(target=self._stop_due_to_silence, daemon=True).start(),
+                    analyzer=self.splitter.live_analyzer(self.sample_rate, self.channels) if self.splitter else None,
+                    on_split=self.split_points.append
+                )
+            else:
+                cmd += ['-t', 'wav', str(temp_wav)]
             
             print(f"Starte Aufnahme: {' '.join(cmd)}")
-            print(f"Ziel-Datei: {temp_wav}")
+            print(f"Ziel-Datei: {self.flac_path if self.use_pipe else temp_wav}")
             
             # Öffne stderr für Fehlerausgabe
             self.process = subprocess.Popen(
@@ -240,22 +299,41 @@ class ALSARecorder:
             
             print(f"arecord-Prozess läuft (PID: {self.process.pid})")
             
-            # Starte Level-Monitoring
-            self._level_thread = threading.Thread(target=self._monitor_level, args=(temp_wav,), daemon=True)
-            self._level_thread.start()
+            if self.use_pipe:
+                # Starte PCM-Reader (Level, Auto-Stop und FLAC-Kodierung)
+                self._reader_thread = threading.Thread(target=self._read_pcm, daemon=True)
+                self._reader_thread.start()
+            else:
+                # Starte Level-Monitoring
+                self._level_thread = threading.Thread(target=self._monitor_level, args=(temp_wav,), daemon=True)
+                self._level_thread.start()
             
             return self.filename
             
         except Exception as e:
             self._is_recording = False
+            self._discard_sink()
             raise Exception(f"Fehler beim Starten der ALSA-Aufnahme: {e}")
     
-    def stop_recording(self):
+    def _discard_sink(self):
+        """Schließe den CaptureSink und lösche die unvollständige FLAC-Datei"""
+        if self._sink is None:
+            return
+        try:
+            self._sink.close(finish_analysis=False)
+        except Exception:
+            pass
+        self._sink = None
+        if self.flac_path and self.flac_path.exists():
+            self.flac_path.unlink()
+    
+    def stop_recording(self, progress_callback=None):
         """Stoppe Aufnahme und konvertiere zu FLAC"""
-        if not self._is_recording:
-            return None
-        
-        self._is_recording = False
+        # Verhindert doppeltes Finalisieren (manueller Stop und Auto-Stop gleichzeitig)
+        with self._stop_lock:
+            if not self._is_recording:
+                return None
+            self._is_recording = False
         self._silence_start_time = None
         self._silence_stop_triggered = False
         
@@ -278,6 +356,9 @@ class ALSARecorder:
                 if stderr_output:
                     print(f"arecord stderr: {stderr_output}")
         
+        if self.use_pipe:
+            return self._finish_pipe()
+        
         # Warte länger, damit Datei vollständig geschrieben wird
         max_wait = 5
         waited = 0
@@ -320,13 +401,16 @@ class ALSARecorder:
         flac_path = self.output_path.parent / flac_filename
         
         try:
-            # Lese WAV und schreibe als FLAC
-            print(f"Konvertiere {self.output_path} zu FLAC...")
-            data, sr = sf.read(str(self.output_path))
-            print(f"Audio-Daten geladen: {len(data)} Samples, {sr} Hz, {data.shape}")
-            sf.write(str(flac_path), data, sr, format='FLAC')
+            # Split-Analyse direkt auf der WAV-Datei, parallel zur FLAC-Kodierung
+            analysis = self._start_wav_analysis()
+            
+            # Blockweise WAV -> FLAC, int16 ohne Float-Umweg
+            transcode_to_flac(self.output_path, flac_path, progress_callback=progress_callback)
             print(f"FLAC-Datei erstellt: {flac_path}")
             
+            if analysis is not None:
+                self._finish_wav_analysis(analysis, flac_path)
+            
             # Lösche temporäres WAV
             self.output_path.unlink()
             
@@ -337,6 +421,75 @@ class ALSARecorder:
             traceback.print_exc()
             raise Exception(f"Fehler beim Konvertieren zu FLAC: {e}")
     
+    def _start_wav_analysis(self):
+        """Berechne die Hüllkurve aus den per np.memmap gemappten WAV-Samples (eigener Thread)
+
+        Die int16-Samples werden direkt aus dem Page-Cache gelesen - die FLAC-Datei
+        muss für die Analyse später nicht mehr dekodiert werden.
+        """
+        if self.splitter is None:
+            return None
+        try:
+            mapped = map_wav_pcm(self.output_path)
+        except Exception as e:
+            print(f"WAV-Datei konnte nicht gemappt werden: {e}")
+            return None
+        if mapped is None:
+            return None
+        samples, sample_rate = mapped
+        analysis = {
+            "samples": samples,
+            "analyzer": self.splitter.live_analyzer(sample_rate, samples.shape[1]),
+            "error": None
+        }
+        
+        def run():
+            try:
+                block_frames = sample_rate * 10
+                for start in range(0, len(samples), block_frames):
+                    analysis["analyzer"].feed(samples[start:start + block_frames])
+            except Exception as e:
+                analysis["error"] = e
+        
+        analysis["thread"] = threading.Thread(target=run, daemon=True)
+        analysis["thread"].start()
+        return analysis
+    
+    def _finish_wav_analysis(self, analysis, flac_path: Path):
+        """Warte auf die WAV-Analyse und speichere die Hüllkurve für die fertige FLAC-Datei"""
+        analysis["thread"].join()
+        # Mapping freigeben, bevor die WAV-Datei gelöscht wird
+        frames = len(analysis.pop("samples"))
+        if analysis["error"] is not None:
+            print(f"Fehler bei der Split-Analyse der WAV-Datei: {analysis['error']}")
+            return
+        try:
+            analyzer = analysis["analyzer"]
+            analyzer.finish(flac_path, frames)
+            self.split_points = list(analyzer.split_points)
+            print(f"Hüllkurve aus WAV berechnet: {len(self.split_points)} vorläufige Split-Punkte")
+        except Exception as e:
+            print(f"Fehler beim Speichern der Hüllkurve: {e}")
+    
+    def _finish_pipe(self):
+        """Warte auf die letzten PCM-Blöcke und schließe die FLAC-Datei"""
+        if self._reader_thread is not None:
+            self._reader_thread.join()
+            self._reader_thread = None
+        
+        sink = self._sink
+        self._sink = None
+        if sink is not None:
+            sink.close()
+        
+        if self._reader_error is not None:
+            raise Exception(f"Fehler beim Lesen der PCM-Daten: {self._reader_error}")
+        if sink is None or sink.frames_written == 0:
+            raise Exception("Keine Audio-Daten von arecord empfangen - Aufnahme ist leer")
+        
+        print(f"FLAC-Datei erstellt: {self.flac_path} ({sink.frames_written / self.sample_rate:.1f}s)")
+        return self.flac_path.name
+    
     def is_recording(self):
         """Prüfe ob Aufnahme läuft"""
         return self._is_recording
@@ -1,12 +1,12 @@
 import pyaudio
-import wave
-import soundfile as sf
 import numpy as np
 from datetime import datetime
 from pathlib import Path
 import threading
 import time
 import subprocess
+from ring_buffer import RingBuffer
+from audio_stream import CaptureSink
 
 class AudioRecorder:
     def __init__(self, device_index=None, sample_rate=44100, channels=2, chunk=4096):
@@ -29,7 +29,6 @@ class AudioRecorder:
         
         self.device_index = device_index
         self._is_recording = False
-        self.frames = []
         self.stream = None
         self.sample_rate = sample_rate
         self.channels = channels
@@ -38,10 +37,19 @@ class AudioRecorder:
         self.current_level = 0.0
         self.filename = None
         self.output_path = None
+        self.flac_path = None
+        self._sink = None
+        self._ring = None
+        self.ring_seconds = 10.0  # Puffergröße zwischen Callback und Consumer
+        self._capture_done = False
+        self._consumer_thread = None
+        self._writer_error = None
+        self._stop_lock = threading.Lock()
         self.silence_threshold_db = -40.0
         self.auto_stop_silence_seconds = 0.0  # 0.0 = deaktiviert (Standard)
-        self._silence_duration = 0.0
-        self._silence_stop_triggered = False
+        self.splitter = None  # TrackSplitter für die Split-Erkennung während der Aufnahme
+        self.split_points = []  # Vorläufige Split-Punkte (Sekunden) der laufenden Aufnahme
+        self.on_auto_stop = None  # Callback für Auto-Stop (startet den Finalize-Job der App)
     
     def set_device(self, device_index):
         """Setze Audio-Gerät"""
@@ -186,40 +194,44 @@ class AudioRecorder:
         return None
     
     def _audio_callback(self, in_data, frame_count, time_info, status):
-        """Callback für Audio-Stream"""
+        """Callback für Audio-Stream - kopiert nur in den Ringpuffer"""
         if self._is_recording:
-            self.frames.append(in_data)
-            # Berechne Audio-Level für Visualisierung
-            audio_data = np.frombuffer(in_data, dtype=np.int16)
-            self.current_level = np.abs(audio_data).mean() / 32768.0
-            self._check_auto_stop(self.current_level, frame_count / self.sample_rate)
+            self._ring.write(np.frombuffer(in_data, dtype=np.int16).reshape(-1, self.channels))
         return (in_data, pyaudio.paContinue)
 
-    def _check_auto_stop(self, level, chunk_duration):
-        if not self.auto_stop_silence_seconds or self.auto_stop_silence_seconds <= 0:
-            return
-        
-        # Verwende eine niedrigere Schwelle für Auto-Stop als für Track-Splitting
-        # -50 dB ist sehr leise und deutet auf echte Stille hin
-        auto_stop_threshold_db = -50.0  # Niedrigere Schwelle für Auto-Stop
-        amplitude_threshold = 10 ** (auto_stop_threshold_db / 20.0)
-        
-        if level <= amplitude_threshold:
-            self._silence_duration += chunk_duration
-            if not self._silence_stop_triggered and self._silence_duration >= self.auto_stop_silence_seconds:
-                self._silence_stop_triggered = True
-                print(f"⚠️  Auto-Stop: Stille erkannt (Level: {level:.6f}, Schwelle: {amplitude_threshold:.6f}, Dauer: {self._silence_duration:.1f}s)")
-                threading.Thread(target=self._stop_due_to_silence, daemon=True).start()
-        else:
-            # Reset nur wenn Level deutlich über Schwelle ist
-            if level > amplitude_threshold * 2:  # Mindestens doppelt so laut wie Schwelle
-                self._silence_duration = 0.0
-                self._silence_stop_triggered = False
+    def _consumer_loop(self):
+        """Metering, Auto-Stop, Split-Erkennung und FLAC-Kodierung außerhalb des Echtzeit-Callbacks"""
+        reported_drops = 0
+        while True:
+            block = self._ring.read()
+            if block is None:
+                if self._capture_done:
+                    break
+                time.sleep(0.02)
+                continue
+            
+            if self._ring.dropped_frames > reported_drops:
+                print(f"⚠️  Ringpuffer-Überlauf: {self._ring.dropped_frames - reported_drops} Frames verworfen")
+                reported_drops = self._ring.dropped_frames
+            
+            if self._writer_error is not None:
+                continue
+            try:
+                self._sink.process(block)
+                self.current_level = self._sink.current_level
+            except Exception as e:
+                # Fehler merken und Puffer weiter leeren
+                self._writer_error = e
+                print(f"Fehler beim Schreiben der FLAC-Datei: {e}")
 
     def _stop_due_to_silence(self):
         try:
             print(f"📢 Automatisches Stoppen nach {self.auto_stop_silence_seconds}s Stille (Level unter -50 dB)")
-            self.stop_recording()
+            if self.on_auto_stop is not None:
+                # Gleicher Weg wie der Stopp-Button: Finalisieren, Splitten, Status
+                self.on_auto_stop()
+            else:
+                self.stop_recording()
         except Exception as e:
             print(f"Fehler beim Stoppen aufgrund von Stille: {e}")
     
@@ -249,10 +261,35 @@ class AudioRecorder:
         except Exception as e:
             raise Exception(f"Gerät {input_device_index} ist nicht verfügbar: {e}")
         
-        self.frames = []
+        # Verwende Template oder Standard-Benennung
+        if filename_template:
+            self.filename = filename_template
+        else:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            self.filename = f"recording_{timestamp}.wav"
+        
+        self.output_path = output_dir / self.filename
+        self.flac_path = self.output_path.parent / (self.output_path.stem + ".flac")
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        # FLAC-Datei direkt öffnen - der Consumer-Thread kodiert während der Aufnahme
+        self.split_points = []
+        self._sink = CaptureSink(
+            self.flac_path,
+            self.sample_rate,
+            self.channels,
+            auto_stop_silence_seconds=self.auto_stop_silence_seconds,
+            on_silence=lambda: threading.Thread(target=self._stop_due_to_silence, daemon=True).start(),
+            analyzer=self.splitter.live_analyzer(self.sample_rate, self.channels) if self.splitter else None,
+            on_split=self.split_points.append
+        )
+        self._ring = RingBuffer(int(self.sample_rate * self.ring_seconds), self.channels)
+        self._capture_done = False
+        self._writer_error = None
+        self._consumer_thread = threading.Thread(target=self._consumer_loop, daemon=True)
+        self._consumer_thread.start()
+        
         self._is_recording = True
-        self._silence_duration = 0.0
-        self._silence_stop_triggered = False
         
         try:
             # Versuche mit konfigurierten Einstellungen
@@ -269,6 +306,7 @@ class AudioRecorder:
             self.stream.start_stream()
         except OSError as e:
             self._is_recording = False
+            self._discard_writer()
             error_msg = str(e)
             if "Invalid input device" in error_msg or "-9996" in error_msg:
                 raise Exception(
@@ -280,50 +318,53 @@ class AudioRecorder:
                 raise Exception(f"Fehler beim Starten der Aufnahme: {e}")
         except Exception as e:
             self._is_recording = False
+            self._discard_writer()
             raise Exception(f"Fehler beim Starten der Aufnahme: {e}")
         
-        # Verwende Template oder Standard-Benennung
-        if filename_template:
-            self.filename = filename_template
-        else:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            self.filename = f"recording_{timestamp}.wav"
-        
-        self.output_path = output_dir / self.filename
-        
         return self.filename
     
-    def stop_recording(self):
+    def _close_writer(self, finish_analysis=True):
+        """Warte bis der Ringpuffer geleert ist und schließe die FLAC-Datei"""
+        if self._consumer_thread is not None:
+            self._capture_done = True
+            self._consumer_thread.join()
+            self._consumer_thread = None
+        if self._sink is not None:
+            self._sink.close(finish_analysis=finish_analysis and self._writer_error is None)
+            self._sink = None
+    
+    def _discard_writer(self):
+        """Schließe Writer und lösche die unvollständige FLAC-Datei"""
+        try:
+            self._close_writer(finish_analysis=False)
+        except Exception:
+            pass
+        if self.flac_path and self.flac_path.exists():
+            self.flac_path.unlink()
+    
+    def stop_recording(self, progress_callback=None):
         """Stoppe Aufnahme und speichere als FLAC"""
-        if not self._is_recording:
-            return None
-        
-        self._is_recording = False
+        # Verhindert doppeltes Finalisieren (manueller Stop und Auto-Stop gleichzeitig)
+        with self._stop_lock:
+            if not self._is_recording:
+                return None
+            self._is_recording = False
         
         if self.stream:
             self.stream.stop_stream()
             self.stream.close()
+            self.stream = None
         
-        # Konvertiere zu FLAC
-        flac_filename = self.output_path.stem + ".flac"
-        flac_path = self.output_path.parent / flac_filename
-        
-        # Speichere als WAV zuerst
-        wf = wave.open(str(self.output_path), 'wb')
-        wf.setnchannels(self.channels)
-        wf.setsampwidth(self.audio.get_sample_size(self.format))
-        wf.setframerate(self.sample_rate)
-        wf.writeframes(b''.join(self.frames))
-        wf.close()
+        # Restliche Puffer kodieren und FLAC-Datei abschließen
+        self._close_writer()
         
-        # Konvertiere zu FLAC
-        data, sr = sf.read(str(self.output_path))
-        sf.write(str(flac_path), data, sr, format='FLAC')
+        if self._writer_error is not None:
+            raise Exception(f"Fehler beim Schreiben der FLAC-Datei: {self._writer_error}")
         
-        # Lösche temporäres WAV
-        self.output_path.unlink()
+        if progress_callback:
+            progress_callback(1.0)
         
-        return flac_filename
+        return self.flac_path.name
     
     def is_recording(self):
         """Prüfe ob Aufnahme läuft"""
@@ -0,0 +1,219 @@
+import soundfile as sf
+import numpy as np
+import shutil
+import struct
+from pathlib import Path
+
+# Reservierter Platz für Tags und Cover, damit spätere Tag-Writes in-place passen
+DEFAULT_FLAC_PADDING = 512 * 1024
+# Länge eines FLAC-Metadatenblocks ist ein 24-bit-Feld
+MAX_FLAC_PADDING = (1 << 24) - 1
+
+def write_flac_with_padding(encoded, dst_path: Path, padding: int = DEFAULT_FLAC_PADDING,
+                            blocksize: int = 1 << 20):
+    """Schreibe fertig kodierte FLAC-Daten (file-like) mit PADDING-Block nach dst_path
+
+    soundfile schreibt FLAC ohne Padding, und nachträglich per mutagen
+    eingefügtes Padding schreibt die ganze Datei ein zweites Mal. Hier werden
+    Metadaten, Padding und Audio-Frames in einem einzigen Durchgang geschrieben.
+    """
+    encoded.seek(0)
+    if encoded.read(4) != b"fLaC":
+        raise ValueError("Keine FLAC-Daten")
+    blocks = []
+    while True:
+        header = encoded.read(4)
+        if len(header) < 4:
+            raise ValueError("Unvollständige FLAC-Metadaten")
+        block_type = header[0] & 0x7F
+        data = encoded.read(int.from_bytes(header[1:], "big"))
+        if block_type != 1:  # vorhandenes Padding wird ersetzt
+            blocks.append((block_type, data))
+        if header[0] & 0x80:
+            break
+    padding = max(0, min(int(padding or 0), MAX_FLAC_PADDING))
+    if padding:
+        blocks.append((1, bytes(padding)))
+
+    with open(dst_path, "wb") as out:
+        out.write(b"fLaC")
+        for index, (block_type, data) in enumerate(blocks):
+            last = 0x80 if index == len(blocks) - 1 else 0
+            out.write(bytes([last | block_type]) + len(data).to_bytes(3, "big"))
+            out.write(data)
+        shutil.copyfileobj(encoded, out, blocksize)
+
+class CaptureSink:
+    """Verarbeitet fortlaufende PCM-Blöcke: Level, Auto-Stop und FLAC-Kodierung"""
+
+    # Verwende eine niedrigere Schwelle für Auto-Stop als für Track-Splitting
+    # -50 dB ist sehr leise und deutet auf echte Stille hin
+    AUTO_STOP_THRESHOLD_DB = -50.0
+
+    def __init__(self, flac_path: Path, sample_rate: int, channels: int,
+                 auto_stop_silence_seconds: float = 0.0, on_silence=None,
+                 analyzer=None, on_split=None):
+        self.flac_path = flac_path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.auto_stop_silence_seconds = auto_stop_silence_seconds
+        self.on_silence = on_silence
+        self.analyzer = analyzer  # Optional: LiveSplitAnalyzer für vorläufige Split-Punkte
+        self.on_split = on_split
+        self.current_level = 0.0
+        self.frames_written = 0
+        self._silence_frames = 0
+        self._silence_stop_triggered = False
+        self._amplitude_threshold = 10 ** (self.AUTO_STOP_THRESHOLD_DB / 20.0)
+        self._file = sf.SoundFile(
+            str(flac_path),
+            mode='w',
+            samplerate=sample_rate,
+            channels=channels,
+            format='FLAC',
+            subtype='PCM_16'
+        )
+
+    def process(self, block: np.ndarray):
+        """Verarbeite einen int16-Block der Form (frames, channels)"""
+        if len(block) == 0:
+            return
+
+        # Mittlerer Absolutwert (normiert auf 0..1) - Maß für Level-Anzeige und Auto-Stop-Schwelle
+        self.current_level = float(np.abs(block.astype(np.float32)).mean() / 32768.0)
+        self._check_auto_stop(len(block))
+
+        self._file.write(block)
+        self.frames_written += len(block)
+
+        if self.analyzer is not None:
+            try:
+                self._report_splits(self.analyzer.feed(block))
+            except Exception as e:
+                # Analyse ist optional - Aufnahme läuft weiter
+                print(f"Fehler bei der Split-Erkennung, deaktiviert: {e}")
+                self.analyzer = None
+
+    def _report_splits(self, split_points):
+        for split_point in split_points:
+            print(f"  Vorläufiger Split-Punkt bei {split_point:.2f}s")
+            if self.on_split:
+                self.on_split(split_point)
+
+    def _check_auto_stop(self, frame_count: int):
+        if not self.auto_stop_silence_seconds or self.auto_stop_silence_seconds <= 0:
+            return
+
+        if self.current_level <= self._amplitude_threshold:
+            # Stille wird sample-genau über die Anzahl der Frames gemessen
+            self._silence_frames += frame_count
+            silence_duration = self._silence_frames / self.sample_rate
+            if not self._silence_stop_triggered and silence_duration >= self.auto_stop_silence_seconds:
+                self._silence_stop_triggered = True
+                print(f"⚠️  Auto-Stop: Stille erkannt (Level: {self.current_level:.6f}, Schwelle: {self._amplitude_threshold:.6f}, Dauer: {silence_duration:.1f}s)")
+                if self.on_silence:
+                    self.on_silence()
+        elif self.current_level > self._amplitude_threshold * 2:
+            # Reset nur wenn Level deutlich über Schwelle ist
+            self._silence_frames = 0
+            self._silence_stop_triggered = False
+
+    def close(self, finish_analysis: bool = True):
+        """Schließe die FLAC-Datei und speichere die Hüllkurve der Aufnahme
+
+        Die Master-Datei bekommt kein Padding: sie wird nicht getaggt, und das
+        Einfügen würde die ganze Aufnahme beim Stoppen ein zweites Mal schreiben.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        analyzer = self.analyzer
+        self.analyzer = None
+        if analyzer is not None and finish_analysis and self.frames_written > 0:
+            try:
+                # Erst nach dem Schließen, damit Größe/mtime zur fertigen Datei passen
+                self._report_splits(analyzer.finish(self.flac_path, self.frames_written))
+            except Exception as e:
+                print(f"Fehler beim Abschließen der Split-Erkennung: {e}")
+
+
+def transcode_to_flac(src_path: Path, dst_path: Path, blocksize: int = 65536, progress_callback=None):
+    """Kodiere eine Audio-Datei blockweise als FLAC (Integer-PCM, konstanter Speicher)"""
+    with sf.SoundFile(str(src_path)) as infile:
+        # 16-bit bleibt int16, alles andere wird als 24-bit kodiert
+        if infile.subtype in ('PCM_16', 'PCM_S8', 'PCM_U8'):
+            dtype, subtype = 'int16', 'PCM_16'
+        else:
+            dtype, subtype = 'int32', 'PCM_24'
+        
+        total_frames = infile.frames
+        print(f"Konvertiere {src_path.name} zu FLAC ({total_frames} Samples, {infile.samplerate} Hz, {infile.channels} Kanäle, {subtype})...")
+        
+        written = 0
+        next_report = 0.1
+        with sf.SoundFile(
+            str(dst_path),
+            mode='w',
+            samplerate=infile.samplerate,
+            channels=infile.channels,
+            format='FLAC',
+            subtype=subtype
+        ) as outfile:
+            for block in infile.blocks(blocksize=blocksize, dtype=dtype, always_2d=True):
+                outfile.write(block)
+                written += len(block)
+                
+                if total_frames > 0:
+                    fraction = min(written / total_frames, 1.0)
+                    if progress_callback:
+                        progress_callback(fraction)
+                    if fraction >= next_report:
+                        print(f"  Konvertiert: {fraction * 100:.0f}%")
+                        next_report += 0.1
+    
+    return written
+
+
+def map_wav_pcm(wav_path: Path):
+    """Mappe die 16-bit-PCM-Daten einer WAV-Datei ohne Kopie in den Speicher
+
+    Gibt (samples, sample_rate) zurück, samples ist ein read-only np.memmap der
+    Form (frames, channels). Fehlt oder stimmt die Größe des data-Chunks nicht
+    (z.B. abgebrochenes arecord), wird bis zum Dateiende gelesen. None, wenn
+    die Datei kein 16-bit-PCM enthält oder leer ist.
+    """
+    file_size = wav_path.stat().st_size
+    with open(wav_path, 'rb') as f:
+        riff, _, wave = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave != b'WAVE':
+            return None
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                fmt = struct.unpack('<HHIIHH', f.read(16))
+                f.seek(chunk_size - 16 + (chunk_size & 1), 1)
+            elif chunk_id == b'data':
+                data_offset = f.tell()
+                break
+            else:
+                f.seek(chunk_size + (chunk_size & 1), 1)
+
+    if fmt is None:
+        return None
+    format_tag, channels, sample_rate, _, _, bits = fmt
+    # 1 = PCM, 0xFFFE = WAVE_FORMAT_EXTENSIBLE (arecord bei mehr als 2 Kanälen)
+    if format_tag not in (1, 0xFFFE) or bits != 16:
+        return None
+
+    available = file_size - data_offset
+    if chunk_size == 0 or chunk_size > available:
+        chunk_size = available
+    frames = chunk_size // (2 * channels)
+    if frames == 0:
+        return None
+    samples = np.memmap(wav_path, dtype='<i2', mode='r', offset=data_offset, shape=(frames, channels))
+    return samples, sample_rate
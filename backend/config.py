@@ -11,6 +11,7 @@ class Config:
                 "device_index": None,  # None = Standard-Gerät
                 "device_name": None,
                 "alsa_device": "hw:1,0",  # ALSA-Gerät (z.B. hw:1,0)
+                "alsa_pipe": True,  # arecord-PCM über stdout lesen statt WAV-Datei
                 "sample_rate": 44100,
                 "channels": 2,
                 "chunk_size": 4096
@@ -25,7 +26,16 @@ class Config:
                 "silence_threshold_db": -40,
                 "min_silence_duration": 2.0,
                 "min_track_duration": 10.0,
-                "auto_stop_silence_duration": 0.0  # 0.0 = deaktiviert (Standard)
+                "auto_stop_silence_duration": 0.0,  # 0.0 = deaktiviert (Standard)
+                "split_workers": 0,  # Threads für das Track-Kodieren (0 = automatisch)
+                "split_subtype": "source",  # "source" = Bittiefe der Aufnahme, oder "PCM_16" / "PCM_24"
+                "flac_padding": 524288  # Reserviertes FLAC-Padding der Tracks in Bytes für in-place Tag-Writes
+            },
+            "metadata": {
+                "cache": True,  # MusicBrainz-/Cover-Antworten in config/metadata_cache.sqlite cachen
+                "cache_max_image_mb": 200,  # Größenlimit für gecachte Cover (LRU)
+                "stale_while_revalidate": True,  # Abgelaufene Einträge sofort liefern, im Hintergrund aktualisieren
+                "release_index": True  # Zuerst im lokalen Index (config/release_index.sqlite) suchen
             }
         }
         self.config = self.load()
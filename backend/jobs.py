@@ -0,0 +1,238 @@
+import asyncio
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, Future
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+class JobCancelled(BaseException):
+    """Wird aus Fortschrittsmeldungen geworfen, wenn ein Job abgebrochen wurde
+
+    Erbt wie asyncio.CancelledError von BaseException, damit allgemeine
+    `except Exception`-Blöcke in Splitter und Tagger den Abbruch nicht schlucken.
+    """
+    pass
+
+def _supported_params(handler, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Parameter verwerfen, die der Handler nicht (mehr) kennt - z.B. aus einer älteren jobs.json"""
+    signature = inspect.signature(handler)
+    if any(p.kind == inspect.Parameter.VAR_KEYWORD for p in signature.parameters.values()):
+        return params
+    return {key: value for key, value in params.items() if key in signature.parameters}
+
+class Job:
+    """Hintergrund-Job mit Status und Fortschritt"""
+
+    def __init__(self, kind: str, params: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.params = params or {}
+        self.state = "queued"  # queued, running, done, failed, cancelled
+        self.progress = 0.0  # 0.0 - 1.0
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.updated = self.created
+        self.version = 0  # Wird bei jeder Änderung erhöht (für WebSocket-Events)
+        self.cancel_requested = False
+
+    def _touch(self):
+        self.updated = time.time()
+        self.version += 1
+
+    def set_progress(self, fraction: float):
+        """Fortschritt melden (0.0 - 1.0) - bricht ab, falls der Job abgebrochen wurde"""
+        if self.cancel_requested:
+            raise JobCancelled(f"Job {self.id} abgebrochen")
+        self.progress = max(0.0, min(float(fraction), 1.0))
+        self._touch()
+
+    def is_active(self) -> bool:
+        return self.state in ("queued", "running")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "state": self.state,
+            "progress": round(self.progress * 100, 1),
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "updated": self.updated
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Job":
+        job = cls(data["kind"], data.get("params"))
+        job.id = data["id"]
+        job.state = data.get("state", "failed")
+        job.progress = data.get("progress", 0.0) / 100.0
+        job.result = data.get("result")
+        job.error = data.get("error")
+        job.created = data.get("created", job.created)
+        job.updated = data.get("updated", job.created)
+        return job
+
+class JobManager:
+    """Persistente Job-Queue mit Worker-Pool, Abbruch und Fortschritt
+
+    Handler werden pro Job-Art registriert und bekommen den Job als erstes
+    Argument sowie die (JSON-serialisierbaren) Parameter als Keyword-Argumente.
+    Der Status wird bei jedem Zustandswechsel gespeichert, damit Jobs einen
+    Neustart überleben.
+    """
+
+    def __init__(self, state_file: Path, max_workers: Optional[int] = None, max_history: int = 100):
+        self.state_file = state_file
+        self.max_history = max_history
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or os.cpu_count() or 2,
+            thread_name_prefix="job"
+        )
+        self._handlers: Dict[str, Dict[str, Any]] = {}
+        self._jobs: Dict[str, Job] = {}
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        # Serialisiert Snapshot und Schreiben - sonst überholen sich parallele Saves
+        self._save_lock = threading.Lock()
+        self.load()
+
+    def register(self, kind: str, handler, resumable: bool = True, dedicated: bool = False):
+        """Registriere Handler für eine Job-Art
+
+        resumable: Job wird nach einem Neustart erneut eingereiht
+        dedicated: Job läuft sofort in einem eigenen Thread statt in der Queue
+        """
+        self._handlers[kind] = {"handler": handler, "resumable": resumable, "dedicated": dedicated}
+
+    def load(self):
+        """Lade gespeicherte Jobs"""
+        if not self.state_file.exists():
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                for data in json.load(f):
+                    job = Job.from_dict(data)
+                    self._jobs[job.id] = job
+        except Exception as e:
+            print(f"Fehler beim Laden der Jobs: {e}")
+
+    def save(self):
+        """Speichere Jobs in Datei (nur bei Zustandswechseln, nicht bei Fortschritt)"""
+        with self._save_lock:
+            with self._lock:
+                jobs = sorted(self._jobs.values(), key=lambda j: j.created)
+                # Alte, abgeschlossene Jobs verwerfen
+                finished = [j for j in jobs if not j.is_active()]
+                for job in finished[:max(0, len(finished) - self.max_history)]:
+                    del self._jobs[job.id]
+                    self._futures.pop(job.id, None)
+                data = [job.to_dict() for job in sorted(self._jobs.values(), key=lambda j: j.created)]
+            try:
+                self.state_file.parent.mkdir(parents=True, exist_ok=True)
+                tmp_file = self.state_file.with_suffix('.tmp')
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                tmp_file.replace(self.state_file)
+            except Exception as e:
+                print(f"Fehler beim Speichern der Jobs: {e}")
+
+    def resume(self):
+        """Nach einem Neustart: unterbrochene Jobs erneut einreihen oder als fehlgeschlagen markieren"""
+        for job in self.list():
+            if not job.is_active():
+                continue
+            handler = self._handlers.get(job.kind)
+            if handler and handler["resumable"]:
+                print(f"Setze Job fort: {job.kind} ({job.id})")
+                job.params = _supported_params(handler["handler"], job.params)
+                job.state = "queued"
+                job.progress = 0.0
+                job._touch()
+                self._dispatch(job)
+            else:
+                job.state = "failed"
+                job.error = "Durch Neustart unterbrochen"
+                job._touch()
+        self.save()
+
+    def submit(self, kind: str, **params) -> Job:
+        """Reihe einen Job ein"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unbekannte Job-Art: {kind}")
+        job = Job(kind, params)
+        with self._lock:
+            self._jobs[job.id] = job
+        self.save()
+        self._dispatch(job)
+        return job
+
+    def _dispatch(self, job: Job):
+        if self._handlers[job.kind]["dedicated"]:
+            future = Future()
+            threading.Thread(target=self._run_into, args=(job, future), daemon=True).start()
+        else:
+            future = self._executor.submit(self._run, job)
+        self._futures[job.id] = future
+
+    def _run_into(self, job: Job, future: Future):
+        self._run(job)
+        future.set_result(None)
+
+    def _run(self, job: Job):
+        if job.cancel_requested:
+            return
+        job.state = "running"
+        job._touch()
+        self.save()
+        try:
+            handler = self._handlers[job.kind]["handler"]
+            job.result = handler(job, **job.params)
+            job.progress = 1.0
+            job.state = "done"
+        except JobCancelled:
+            job.state = "cancelled"
+            print(f"Job abgebrochen: {job.kind} ({job.id})")
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            job.error = str(e)
+            job.state = "failed"
+        job._touch()
+        self.save()
+
+    def cancel(self, job_id: str) -> bool:
+        """Brich einen Job ab (wartende sofort, laufende bei der nächsten Fortschrittsmeldung)"""
+        job = self.get(job_id)
+        if job is None or not job.is_active():
+            return False
+        job.cancel_requested = True
+        if job.state == "queued":
+            job.state = "cancelled"
+            job._touch()
+            self.save()
+        return True
+
+    async def wait(self, job_id: str) -> Optional[Job]:
+        """Warte asynchron auf das Ende eines Jobs (None wie bei get(), falls unbekannt/verworfen)"""
+        future = self._futures.get(job_id)
+        if future is not None:
+            await asyncio.wrap_future(future)
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda j: j.created)
+
+    def has_active(self, kind: str) -> bool:
+        """Prüfe ob ein Job dieser Art noch läuft"""
+        return any(job.kind == kind and job.is_active() for job in self.list())
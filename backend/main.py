@@ -1,20 +1,24 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, Form
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse, Response
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Optional
 import uvicorn
 import os
 import json
+import threading
 from pathlib import Path
 from datetime import datetime
 from audio_recorder import AudioRecorder
 from alsa_recorder import ALSARecorder
 from track_splitter import TrackSplitter
 from tagger import AudioTagger
-from metadata_search import MetadataSearcher
+from metadata_search import MetadataSearcher, ResponseCache
+from release_index import ReleaseIndex
+from track_alignment import align_tracks
 from config import Config
 from recording_state import RecordingState
+from jobs import JobManager
 import asyncio
 
 app = FastAPI(title="Vinyl Digitalizer")
@@ -161,6 +165,7 @@ if use_alsa or recorder is None:
         )
         recorder.auto_stop_silence_seconds = auto_stop_silence_duration
         recorder.silence_threshold_db = config.get("recording.silence_threshold_db", -40)
+        recorder.use_pipe = config.get("audio.alsa_pipe", True)
         print(f"✓ ALSA-Recorder initialisiert mit Gerät: {alsa_device}")
     except Exception as e:
         print(f"Fehler: ALSA-Recorder konnte nicht initialisiert werden: {e}")
@@ -171,9 +176,37 @@ splitter = TrackSplitter()
 splitter.silence_threshold = config.get("recording.silence_threshold_db", -40)
 splitter.min_silence_duration = config.get("recording.min_silence_duration", 2.0)
 splitter.min_track_duration = config.get("recording.min_track_duration", 10.0)
+splitter.workers = config.get("recording.split_workers", 0) or None
+split_subtype = config.get("recording.split_subtype", "source")
+splitter.output_subtype = split_subtype if split_subtype in ("PCM_16", "PCM_24") else None
+flac_padding = config.get("recording.flac_padding", 524288)
+splitter.flac_padding = flac_padding
+if recorder is not None:
+    # Vorläufige Split-Punkte schon während der Aufnahme erkennen
+    recorder.splitter = splitter
 
-tagger = AudioTagger()
-metadata_searcher = MetadataSearcher()
+tagger = AudioTagger(padding=flac_padding)
+metadata_cache = None
+if config.get("metadata.cache", True):
+    try:
+        metadata_cache = ResponseCache(
+            CONFIG_DIR / "metadata_cache.sqlite",
+            max_image_bytes=int(config.get("metadata.cache_max_image_mb", 200)) * 1024 * 1024,
+            stale_seconds=ResponseCache.DEFAULT_STALE_SECONDS if config.get("metadata.stale_while_revalidate", True) else 0
+        )
+    except Exception as e:
+        print(f"Warnung: Metadaten-Cache nicht verfügbar: {e}")
+release_index = None
+if config.get("metadata.release_index", True):
+    # Befüllen mit: python backend/release_index.py import <dump>
+    try:
+        release_index = ReleaseIndex(CONFIG_DIR / "release_index.sqlite")
+    except Exception as e:
+        print(f"Warnung: Lokaler Release-Index nicht verfügbar: {e}")
+metadata_searcher = MetadataSearcher(cache=metadata_cache, index=release_index)
+
+# Hintergrund-Jobs (Finalisierung, Splitting, Tagging, ZIP) - blockieren den Event-Loop nicht
+jobs = JobManager(CONFIG_DIR / "jobs.json")
 
 # Prüfe beim Start ob eine Aufnahme läuft und stelle sie wieder her
 def restore_recording_state():
@@ -223,6 +256,295 @@ def restore_recording_state():
 # Stelle Aufnahme-Status wieder her
 restore_recording_state()
 
+# Job-Handler - laufen im Worker-Pool und melden Fortschritt über job.set_progress
+def finalize_recording(job, release_mbid: Optional[str] = None):
+    """Stoppe Aufnahme und schreibe FLAC-Datei fertig"""
+    filename = recorder.stop_recording(progress_callback=job.set_progress)
+    if filename is None:
+        raise Exception("Aufnahme wurde bereits gestoppt")
+    result = {"filename": filename}
+    if config.get("recording.auto_split", True):
+        # Splitten, Taggen und Waveform direkt im Anschluss
+        pipeline = jobs.submit("process_recording", filename=filename, release_mbid=release_mbid)
+        result["pipeline_job_id"] = pipeline.id
+    return result
+
+def split_tracks_job(job, filename: str):
+    """Splitte eine Aufnahme in Tracks"""
+    tracks = splitter.split_audio(RECORDINGS_DIR / filename, RECORDINGS_DIR, progress_callback=job.set_progress)
+    return {"tracks": tracks}
+
+def fetch_release(release_mbid: str, base_name: str):
+    """Lade Release-Details und Cover von MusicBrainz / Cover Art Archive"""
+    # Hole Release-Details von MusicBrainz (über den gemeinsamen Rate-Limiter)
+    release_data = metadata_searcher.get_release(release_mbid)
+    
+    # Hole Cover-Art
+    cover_path = None
+    try:
+        cover_data = metadata_searcher.get_front_cover(release_mbid)
+        if cover_data:
+            cover_path = RECORDINGS_DIR / f"{base_name}_cover.jpg"
+            cover_path.write_bytes(cover_data)
+            print(f"✓ Cover-Art gespeichert: {cover_path}")
+    except Exception as e:
+        print(f"Fehler beim Laden des Covers: {e}")
+    
+    return release_data, cover_path
+
+def align_track_titles(track_files, media_tracks):
+    """Titel und Disc pro Track-Datei über die Track-Längen bestimmen
+
+    Fallback ohne lesbare Längen: Zuordnung nach Reihenfolge wie bisher.
+    """
+    import soundfile as sf
+    try:
+        durations = [sf.info(str(track_file)).duration for track_file in track_files]
+        mapping = align_tracks(durations, [[t["length"] / 1000.0 if t["length"] else None for t in media_tracks]])[0]["mapping"]
+    except Exception as e:
+        print(f"Duration-Alignment nicht möglich, Zuordnung nach Reihenfolge: {e}")
+        mapping = [
+            {"reference": [i] if i < len(media_tracks) else [], "kind": "match", "confidence": None}
+            for i in range(len(track_files))
+        ]
+    
+    assignment = []
+    for i, entry in enumerate(mapping):
+        reference = [media_tracks[j] for j in entry["reference"]]
+        if not reference:
+            # Mehr Tracks als Metadaten oder kein passender Release-Track: Platzhalter
+            assignment.append({"title": f"Track {i + 1}", "confidence": 0.0})
+            continue
+        title = " / ".join(track["title"] for track in reference)
+        if entry["kind"] == "split":
+            title = f"{title} (Teil {entry['part']})"
+        assignment.append({
+            "title": title,
+            "disc_number": reference[0].get("disc_number", 1),
+            "confidence": entry["confidence"]
+        })
+        if entry["confidence"] is not None and entry["confidence"] < 0.5:
+            print(f"⚠️  Unsichere Zuordnung: Track {i + 1} -> {title} (Konfidenz {entry['confidence']})")
+    return assignment
+
+def tag_album_tracks(track_files, release_data, cover_path=None, progress_callback=None):
+    """Tagge Track-Dateien der Reihe nach mit den Release-Daten"""
+    album_title = release_data.get("title", "")
+    album_artist = ""
+    if release_data.get("artist-credit"):
+        album_artist = release_data.get("artist-credit", [{}])[0].get("name", "")
+    album_date = release_data.get("date", "")[:4] if release_data.get("date") else None
+    
+    # Extrahiere Track-Informationen aus Media (alle Media zusammen)
+    # Bei Multi-Disc: Alle Tracks über alle Discs hinweg
+    media_tracks = []
+    for medium in release_data.get("media", []):
+        medium_position = medium.get("position", 1)
+        # Bei Vinyl: Medium 1-2 = Disc 1, Medium 3-4 = Disc 2, etc.
+        # Bei CD: Jedes Medium = 1 Disc
+        is_vinyl = medium.get("format", "").lower() in ["vinyl", "12\"", "lp", ""]
+        if is_vinyl:
+            disc_number = (medium_position + 1) // 2
+        else:
+            disc_number = medium_position
+        
+        for track in medium.get("tracks", []):
+            recording = track.get("recording", {})
+            media_tracks.append({
+                "position": track.get("position", 0),
+                "title": recording.get("title", "") if recording else "",
+                "length": track.get("length", 0),
+                "medium_position": medium_position,
+                "disc_number": disc_number
+            })
+    
+    # Sortiere Tracks nach Disc-Nummer, Medium-Position und Track-Position
+    media_tracks.sort(key=lambda x: (x["disc_number"], x["medium_position"], x["position"]))
+    
+    print(f"Gefundene Tracks in MusicBrainz: {len(media_tracks)}")
+    print(f"Tracks in Dateien: {len(track_files)}")
+    
+    # Titel per Duration-Alignment zuordnen - ein verpasster oder zusätzlicher Split
+    # verschiebt so nicht alle folgenden Titel
+    assignment = align_track_titles(track_files, media_tracks)
+    
+    # Tags pro Datei zusammenstellen, geschrieben wird parallel
+    items = []
+    for i, track_file in enumerate(track_files):
+        tags = {
+            "artist": album_artist,
+            "album": album_title,
+            "track_number": i + 1,
+            "year": album_date,
+            "cover_path": cover_path,
+            "album_artist": album_artist,
+            "total_tracks": len(track_files)
+        }
+        tags["title"] = assignment[i]["title"]
+        if "disc_number" in assignment[i]:
+            tags["disc_number"] = assignment[i]["disc_number"]
+        items.append((track_file, tags))
+    
+    summary = tagger.tag_files(items, progress_callback=progress_callback)
+    if summary["errors"] == len(items):
+        raise Exception(f"Keine Datei konnte getaggt werden: {summary['files'][0]['error']}")
+    
+    print(f"Tag-Writes: {summary['unchanged']} unverändert, {summary['in_place_writes']} in-place, {summary['rewrites']} Dateien neu geschrieben, {summary['errors']} Fehler")
+    return {
+        "tagged_tracks": summary["tagged"],
+        "unchanged": summary["unchanged"],
+        "in_place_writes": summary["in_place_writes"],
+        "rewrites": summary["rewrites"],
+        "errors": summary["errors"],
+        "files": summary["files"],
+        "alignment": [
+            {"filename": Path(track_file).name, **assignment[i]} for i, track_file in enumerate(track_files)
+        ],
+        "album": album_title,
+        "artist": album_artist
+    }
+
+def auto_tag_album_job(job, base_filename: str, release_mbid: str):
+    """Tagge alle Tracks einer Aufnahme mit MusicBrainz-Daten"""
+    base_name = Path(base_filename).stem.replace('_track_', '').split('_track_')[0]
+    track_files = sorted(RECORDINGS_DIR.glob(f"{base_name}_track_*.flac"))
+    if not track_files:
+        raise Exception("Keine Tracks für dieses Album gefunden")
+    
+    release_data, cover_path = fetch_release(release_mbid, base_name)
+    return tag_album_tracks(track_files, release_data, cover_path, progress_callback=job.set_progress)
+
+def process_recording_job(job, filename: str, release_mbid: Optional[str] = None):
+    """Nach der Aufnahme: Splitten, optional Taggen und Waveform-Daten erzeugen
+
+    Die Release-Daten werden parallel zum Splitten geladen. Das Splitten
+    nutzt die während der Aufnahme berechnete Hüllkurve; fehlt sie, wird sie
+    zuerst in einem eigenen Lesedurchgang berechnet, danach liest jeder Track
+    seinen Abschnitt. Die Waveforms entstehen aus derselben Hüllkurve ohne
+    erneutes Dekodieren.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    audio_path = RECORDINGS_DIR / filename
+    result = {"filename": filename}
+    
+    with ThreadPoolExecutor(max_workers=1) as prefetch:
+        release_future = prefetch.submit(fetch_release, release_mbid, audio_path.stem) if release_mbid else None
+        
+        tracks = splitter.split_audio(audio_path, RECORDINGS_DIR, progress_callback=lambda f: job.set_progress(0.8 * f))
+        result["tracks"] = tracks
+        
+        try:
+            splitter.build_waveforms(audio_path, tracks, RECORDINGS_DIR)
+        except Exception as e:
+            print(f"Fehler beim Erzeugen der Waveforms: {e}")
+        job.set_progress(0.85)
+        
+        if release_future is not None:
+            try:
+                release_data, cover_path = release_future.result()
+                track_files = [RECORDINGS_DIR / track["filename"] for track in tracks]
+                result["tagging"] = tag_album_tracks(
+                    track_files, release_data, cover_path,
+                    progress_callback=lambda f: job.set_progress(0.85 + 0.15 * f)
+                )
+            except Exception as e:
+                # Tracks sind fertig - Tagging kann manuell wiederholt werden
+                print(f"Fehler beim automatischen Taggen: {e}")
+                result["tag_error"] = str(e)
+    
+    return result
+
+def album_zip_job(job, base_filename: str):
+    """Erstelle ZIP-Datei eines Albums"""
+    import zipfile
+    
+    base_name = Path(base_filename).stem.replace('_track_', '').split('_track_')[0]
+    album_files = []
+    original_file = RECORDINGS_DIR / base_filename
+    if original_file.exists():
+        album_files.append(original_file)
+    album_files.extend(RECORDINGS_DIR.glob(f"{base_name}_track_*.flac"))
+    
+    zip_filename = f"{base_name}_album.zip"
+    zip_path = RECORDINGS_DIR / zip_filename
+    
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for i, file in enumerate(album_files):
+            zipf.write(file, file.name)
+            job.set_progress((i + 1) / len(album_files))
+    
+    return {"zip_filename": zip_filename}
+
+def collection_zip_job(job):
+    """Erstelle ZIP-Datei aller Alben"""
+    import zipfile
+    from mutagen.flac import FLAC
+    
+    # Sammle alle Alben
+    albums = {}
+    for file in RECORDINGS_DIR.glob("*_track_*.flac"):
+        try:
+            audio = FLAC(str(file))
+            album = audio.get('ALBUM', ['Unbekanntes Album'])[0]
+            artist = audio.get('ALBUMARTIST', audio.get('ARTIST', ['Unbekannter Künstler'])[0])[0]
+            album_key = f"{artist} - {album}"
+            
+            if album_key not in albums:
+                albums[album_key] = []
+            albums[album_key].append(file)
+        except:
+            continue
+    
+    if not albums:
+        return None
+    
+    # Erstelle ZIP
+    zip_filename = f"vinyl_collection_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    zip_path = RECORDINGS_DIR / zip_filename
+    total_files = sum(len(files) for files in albums.values())
+    done_files = 0
+    
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for album_key, files in albums.items():
+            # Erstelle Ordner für jedes Album
+            safe_folder = "".join(c for c in album_key if c.isalnum() or c in (' ', '-', '_')).strip()
+            for file in sorted(files):
+                zipf.write(file, f"{safe_folder}/{file.name}")
+                done_files += 1
+                job.set_progress(done_files / total_files)
+    
+    return {"zip_filename": zip_filename}
+
+jobs.register("finalize", finalize_recording, resumable=False, dedicated=True)
+jobs.register("split", split_tracks_job)
+jobs.register("auto_tag", auto_tag_album_job)
+jobs.register("process_recording", process_recording_job)
+jobs.register("album_zip", album_zip_job, resumable=False)
+jobs.register("collection_zip", collection_zip_job, resumable=False)
+
+# Unterbrochene Jobs nach Neustart fortsetzen
+jobs.resume()
+
+_finalize_lock = threading.Lock()
+
+def submit_finalize(release_mbid: Optional[str] = None):
+    """Aufnahme über den Finalize-Job stoppen (Stopp-Button und Auto-Stop)
+
+    Gibt None zurück, wenn keine Aufnahme läuft oder schon finalisiert wird.
+    """
+    with _finalize_lock:
+        if recorder is None or not recorder.is_recording() or jobs.has_active("finalize"):
+            return None
+        # FLAC-Finalisierung läuft als Job im Executor
+        # (bei recording.auto_split folgt automatisch Splitten/Taggen)
+        job = jobs.submit("finalize", release_mbid=release_mbid or recording_state.get_release_mbid())
+        # Aktualisiere persistenten Status
+        recording_state.stop_recording()
+        return job
+
+if recorder is not None:
+    recorder.on_auto_stop = submit_finalize
+
 @app.get("/")
 async def read_root():
     """Serviere HTML-Datei - MUSS NACH ALLEN ANDEREN ROUTEN KOMMEN!"""
@@ -297,11 +619,12 @@ async def get_status():
         "alsa_devices": alsa_devices,
         "use_alsa": is_alsa,
         "current_device": current_device,
-        "recording_filename": recording_filename
+        "recording_filename": recording_filename,
+        "split_points": list(recorder.split_points) if recorder.is_recording() else []
     }
 
 @app.post("/api/start-recording")
-async def start_recording():
+async def start_recording(release_mbid: Optional[str] = Form(None)):
     if recorder is None:
         return JSONResponse(
             {"error": "AudioRecorder nicht verfügbar"}, 
@@ -332,29 +655,46 @@ async def start_recording():
     # Speichere Status persistent
     recorder_type = "alsa" if isinstance(recorder, ALSARecorder) else "pyaudio"
     device = recorder.alsa_device if isinstance(recorder, ALSARecorder) else recorder.device_index
-    recording_state.start_recording(filename, recorder_type, device)
+    recording_state.start_recording(filename, recorder_type, device, release_mbid=release_mbid or None)
     
     return {"filename": filename, "status": "recording_started"}
 
 @app.post("/api/stop-recording")
-async def stop_recording():
+async def stop_recording(release_mbid: Optional[str] = Form(None)):
     if recorder is None:
         return JSONResponse(
             {"error": "AudioRecorder nicht verfügbar"}, 
             status_code=503
         )
-    if not recorder.is_recording():
+    # Antwort kommt sofort, der Finalize-Job meldet sich per WebSocket
+    job = submit_finalize(release_mbid)
+    if job is None:
         return JSONResponse(
             {"error": "Keine Aufnahme aktiv"}, 
             status_code=400
         )
     
-    filename = recorder.stop_recording()
-    
-    # Aktualisiere persistenten Status
-    recording_state.stop_recording()
-    
-    return {"filename": filename, "status": "recording_stopped"}
+    return {"job_id": job.id, "status": "finalizing"}
+
+@app.get("/api/jobs")
+async def list_jobs():
+    """Liste aller Hintergrund-Jobs"""
+    return {"jobs": [job.to_dict() for job in jobs.list()]}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, Fortschritt und Ergebnis eines Jobs"""
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "Job nicht gefunden"}, status_code=404)
+    return job.to_dict()
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Brich einen wartenden oder laufenden Job ab"""
+    if not jobs.cancel(job_id):
+        return JSONResponse({"error": "Job nicht gefunden oder bereits beendet"}, status_code=404)
+    return {"status": "cancelling", "job_id": job_id}
 
 @app.get("/api/recordings")
 async def list_recordings():
@@ -457,50 +797,77 @@ async def get_cover(filename: str):
 @app.get("/api/download-collection")
 async def download_collection():
     """Download aller Alben als ZIP"""
-    import zipfile
-    from mutagen.flac import FLAC
-    
-    # Sammle alle Alben
-    albums = {}
-    for file in RECORDINGS_DIR.glob("*_track_*.flac"):
-        try:
-            audio = FLAC(str(file))
-            album = audio.get('ALBUM', ['Unbekanntes Album'])[0]
-            artist = audio.get('ALBUMARTIST', audio.get('ARTIST', ['Unbekannter Künstler'])[0])[0]
-            album_key = f"{artist} - {album}"
-            
-            if album_key not in albums:
-                albums[album_key] = []
-            albums[album_key].append(file)
-        except:
-            continue
-    
-    if not albums:
+    job = await jobs.wait(jobs.submit("collection_zip").id)
+    if job is None:
+        return JSONResponse({"error": "Job nicht gefunden"}, status_code=404)
+    if job.state != "done":
+        return JSONResponse({"error": f"Fehler: {job.error}"}, status_code=500)
+    if job.result is None:
         return JSONResponse({"error": "Keine Alben gefunden"}, status_code=404)
     
-    # Erstelle ZIP
-    zip_filename = f"vinyl_collection_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
-    zip_path = RECORDINGS_DIR / zip_filename
+    zip_filename = job.result["zip_filename"]
+    return FileResponse(
+        str(RECORDINGS_DIR / zip_filename),
+        media_type="application/zip",
+        filename=zip_filename,
+        headers={"Content-Disposition": f'attachment; filename="{zip_filename}"'}
+    )
+
+@app.post("/api/split-tracks")
+async def split_tracks(filename: str = Form(...)):
+    filepath = RECORDINGS_DIR / filename
+    if not filepath.exists():
+        return JSONResponse(
+            {"error": "Datei nicht gefunden"}, 
+            status_code=404
+        )
     
     try:
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for album_key, files in albums.items():
-                # Erstelle Ordner für jedes Album
-                safe_folder = "".join(c for c in album_key if c.isalnum() or c in (' ', '-', '_')).strip()
-                for file in sorted(files):
-                    zipf.write(file, f"{safe_folder}/{file.name}")
-        
-        return FileResponse(
-            str(zip_path),
-            media_type="application/zip",
-            filename=zip_filename,
-            headers={"Content-Disposition": f'attachment; filename="{zip_filename}"'}
+        job = jobs.submit("split", filename=filename)
+        return {"job_id": job.id, "status": "queued"}
+    except Exception as e:
+        return JSONResponse(
+            {"error": str(e)}, 
+            status_code=500
+        )
+
+@app.post("/api/split-preview")
+async def split_preview(
+    filename: str = Form(...),
+    silence_threshold_db: Optional[float] = Form(None),
+    min_silence_duration: Optional[float] = Form(None),
+    min_track_duration: Optional[float] = Form(None)
+):
+    """Vorgeschlagene Split-Punkte für beliebige Parameter (aus der gecachten Hüllkurve)"""
+    filepath = RECORDINGS_DIR / filename
+    if not filepath.exists():
+        return JSONResponse(
+            {"error": "Datei nicht gefunden"}, 
+            status_code=404
         )
+    
+    try:
+        # Ohne Cache muss einmal analysiert werden - nicht im Event-Loop
+        loop = asyncio.get_running_loop()
+        preview = await loop.run_in_executor(
+            None,
+            lambda: splitter.preview_splits(
+                filepath,
+                silence_threshold=silence_threshold_db,
+                min_silence_duration=min_silence_duration,
+                min_track_duration=min_track_duration
+            )
+        )
+        return {**preview, "status": "success"}
     except Exception as e:
-        return JSONResponse({"error": f"Fehler: {e}"}, status_code=500)
+        return JSONResponse(
+            {"error": str(e)}, 
+            status_code=500
+        )
 
-@app.post("/api/split-tracks")
-async def split_tracks(filename: str = Form(...)):
+@app.get("/api/waveform/{filename}")
+async def get_waveform(filename: str):
+    """Waveform-Daten (normierte Spitzenwerte) einer Aufnahme oder eines Tracks"""
     filepath = RECORDINGS_DIR / filename
     if not filepath.exists():
         return JSONResponse(
@@ -509,8 +876,9 @@ async def split_tracks(filename: str = Form(...)):
         )
     
     try:
-        tracks = splitter.split_audio(filepath, RECORDINGS_DIR)
-        return {"tracks": tracks, "status": "success"}
+        # Ohne Cache muss die Datei einmal analysiert werden - nicht im Event-Loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: splitter.load_waveform(filepath))
     except Exception as e:
         return JSONResponse(
             {"error": str(e)}, 
@@ -518,22 +886,73 @@ async def split_tracks(filename: str = Form(...)):
         )
 
 @app.post("/api/search-album")
-async def search_album(artist: str = Form(...), album: str = Form(...)):
-    """Suche nach Album in MusicBrainz"""
+async def search_album(artist: str = Form(...), album: str = Form(...), details: bool = Form(False)):
+    """Suche nach Album in MusicBrainz
+
+    Liefert sofort die Treffer der Suche; Media, Track-Längen und Cover kommen
+    über /api/search-album/details nach. Mit details=true wird wie früher auf
+    alle Details gewartet.
+    """
     try:
-        releases = metadata_searcher.search_album(artist, album)
-        return {"releases": releases, "status": "success"}
+        if details:
+            releases = await metadata_searcher.search_album(artist, album)
+        else:
+            releases = await metadata_searcher.search_releases(artist, album)
+        return {"releases": releases, "details_pending": not details, "status": "success"}
     except Exception as e:
         return JSONResponse(
             {"error": str(e)}, 
             status_code=500
         )
 
+def recording_track_durations(base_filename: str):
+    """Längen der bereits gesplitteten Tracks einer Aufnahme (für das Release-Scoring)"""
+    import soundfile as sf
+    base_name = Path(base_filename).stem.replace('_track_', '').split('_track_')[0]
+    return [
+        {"filename": file.name, "duration": sf.info(str(file)).duration}
+        for file in sorted(RECORDINGS_DIR.glob(f"{base_name}_track_*.flac"))
+    ]
+
+@app.get("/api/search-album/details")
+async def search_album_details(mbids: str, base_filename: Optional[str] = None):
+    """Release-Details als Server-Sent Events, sobald sie ankommen
+
+    mbids: kommagetrennt in der gewünschten Reihenfolge (bester Treffer zuerst).
+    Mit base_filename werden nach jedem Release alle bisher geladenen Releases
+    per Duration-Alignment gegen die Tracks der Aufnahme bewertet: das Release
+    bekommt "score"/"alignment_confidence", ein "ranking"-Event die Reihenfolge.
+    """
+    releases = [{"mbid": mbid, "media": []} for mbid in mbids.split(",") if mbid]
+    durations = []
+    if base_filename:
+        try:
+            loop = asyncio.get_running_loop()
+            durations = [track["duration"] for track in await loop.run_in_executor(None, recording_track_durations, base_filename)]
+        except Exception as e:
+            print(f"Fehler beim Lesen der Track-Längen: {e}")
+    
+    async def events():
+        detailed = []
+        async for release in metadata_searcher.iter_release_details(releases):
+            ranking = None
+            if durations and "error" not in release:
+                detailed.append(release)
+                ranking = metadata_searcher.rank_releases(detailed, durations)
+                own = next(entry for entry in ranking if entry["mbid"] == release["mbid"])
+                release["score"] = own["score"]
+                release["alignment_confidence"] = own["confidence"]
+            yield f"event: release\ndata: {json.dumps(release, ensure_ascii=False)}\n\n"
+            if ranking is not None:
+                yield f"event: ranking\ndata: {json.dumps(ranking)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.post("/api/auto-tag-album")
 async def auto_tag_album(
     base_filename: str = Form(...),
-    release_mbid: str = Form(...),
-    tracks_per_side: Optional[int] = Form(None)
+    release_mbid: str = Form(...)
 ):
     """Automatisches Tagging eines Albums basierend auf MusicBrainz-Daten"""
     try:
@@ -547,108 +966,14 @@ async def auto_tag_album(
                 status_code=404
             )
         
-        # Hole Release-Details von MusicBrainz
-        release_url = f"{metadata_searcher.musicbrainz_base}/release/{release_mbid}"
-        params = {
-            "inc": "recordings+media+artist-credits",
-            "fmt": "json"
-        }
-        import requests
-        response = requests.get(release_url, params=params, headers=metadata_searcher.headers, timeout=10)
-        response.raise_for_status()
-        release_data = response.json()
-        
-        # Extrahiere Album-Informationen
-        album_title = release_data.get("title", "")
-        album_artist = ""
-        if release_data.get("artist-credit"):
-            album_artist = release_data.get("artist-credit", [{}])[0].get("name", "")
-        album_date = release_data.get("date", "")[:4] if release_data.get("date") else None
-        
-        # Hole Cover-Art
-        cover_path = None
-        try:
-            cover_url = f"{metadata_searcher.coverart_base}/release/{release_mbid}/front"
-            cover_response = requests.get(cover_url, headers=metadata_searcher.headers, timeout=10)
-            if cover_response.status_code == 200:
-                cover_path = RECORDINGS_DIR / f"{base_name}_cover.jpg"
-                cover_path.write_bytes(cover_response.content)
-                print(f"✓ Cover-Art gespeichert: {cover_path}")
-        except Exception as e:
-            print(f"Fehler beim Laden des Covers: {e}")
-        
-        # Extrahiere Track-Informationen aus Media (alle Media zusammen)
-        # Bei Multi-Disc: Alle Tracks über alle Discs hinweg
-        media_tracks = []
-        for medium in release_data.get("media", []):
-            medium_position = medium.get("position", 1)
-            # Bei Vinyl: Medium 1-2 = Disc 1, Medium 3-4 = Disc 2, etc.
-            # Bei CD: Jedes Medium = 1 Disc
-            is_vinyl = medium.get("format", "").lower() in ["vinyl", "12\"", "lp", ""]
-            if is_vinyl:
-                disc_number = (medium_position + 1) // 2
-            else:
-                disc_number = medium_position
-            
-            for track in medium.get("tracks", []):
-                recording = track.get("recording", {})
-                media_tracks.append({
-                    "position": track.get("position", 0),
-                    "title": recording.get("title", "") if recording else "",
-                    "length": track.get("length", 0),
-                    "medium_position": medium_position,
-                    "disc_number": disc_number
-                })
-        
-        # Sortiere Tracks nach Disc-Nummer, Medium-Position und Track-Position
-        media_tracks.sort(key=lambda x: (x["disc_number"], x["medium_position"], x["position"]))
-        
-        print(f"Gefundene Tracks in MusicBrainz: {len(media_tracks)}")
-        print(f"Tracks in Dateien: {len(track_files)}")
-        
-        # Tagge alle Tracks
-        tagged_count = 0
-        for i, track_file in enumerate(track_files):
-            if i < len(media_tracks):
-                track_info = media_tracks[i]
-                tagger.tag_file(
-                    track_file,
-                    title=track_info["title"],
-                    artist=album_artist,
-                    album=album_title,
-                    track_number=i + 1,
-                    year=album_date,
-                    cover_path=cover_path,
-                    album_artist=album_artist,
-                    disc_number=track_info.get("disc_number", 1),
-                    total_tracks=len(track_files)
-                )
-                tagged_count += 1
-            else:
-                # Falls mehr Tracks als Metadaten vorhanden sind, tagge mit Platzhalter
-                tagger.tag_file(
-                    track_file,
-                    title=f"Track {i + 1}",
-                    artist=album_artist,
-                    album=album_title,
-                    track_number=i + 1,
-                    year=album_date,
-                    cover_path=cover_path,
-                    album_artist=album_artist,
-                    total_tracks=len(track_files)
-                )
-                tagged_count += 1
-        
-        return {
-            "status": "success",
-            "tagged_tracks": tagged_count,
-            "album": album_title,
-            "artist": album_artist
-        }
+        job = jobs.submit(
+            "auto_tag",
+            base_filename=base_filename,
+            release_mbid=release_mbid
+        )
+        return {"job_id": job.id, "status": "queued"}
         
     except Exception as e:
-        import traceback
-        traceback.print_exc()
         return JSONResponse(
             {"error": str(e)}, 
             status_code=500
@@ -670,14 +995,55 @@ async def tag_track(
         )
     
     try:
-        tagger.tag_file(
-            filepath,
-            title=title,
-            artist=artist,
-            album=album,
-            track_number=track_number
+        # Gleicher Weg wie beim Batch-Tagging, aber nicht im Event-Loop
+        loop = asyncio.get_running_loop()
+        summary = await loop.run_in_executor(None, lambda: tagger.tag_files([(filepath, {
+            "title": title,
+            "artist": artist,
+            "album": album,
+            "track_number": track_number
+        })]))
+        result = summary["files"][0]
+        if "error" in result:
+            raise Exception(result["error"])
+        return {"status": "success", **result}
+    except Exception as e:
+        return JSONResponse(
+            {"error": str(e)}, 
+            status_code=500
+        )
+
+# Felder, die beim Batch-Tagging pro Track gesetzt werden dürfen
+BATCH_TAG_FIELDS = ("title", "artist", "album", "album_artist", "track_number",
+                    "total_tracks", "disc_number", "year", "genre")
+
+@app.post("/api/tag-tracks")
+async def tag_tracks(tracks: str = Form(...)):
+    """Tagge mehrere Tracks auf einmal (JSON-Liste mit filename und Tag-Feldern)"""
+    try:
+        entries = json.loads(tracks)
+        if not isinstance(entries, list):
+            raise ValueError("tracks muss eine Liste sein")
+    except ValueError as e:
+        return JSONResponse(
+            {"error": f"Ungültige Track-Liste: {e}"}, 
+            status_code=400
         )
-        return {"status": "success"}
+    
+    items = []
+    for entry in entries:
+        filepath = RECORDINGS_DIR / str(entry.get("filename", ""))
+        if not entry.get("filename") or not filepath.exists():
+            return JSONResponse(
+                {"error": f"Datei nicht gefunden: {entry.get('filename')}"}, 
+                status_code=404
+            )
+        items.append((filepath, {key: entry[key] for key in BATCH_TAG_FIELDS if key in entry}))
+    
+    try:
+        loop = asyncio.get_running_loop()
+        summary = await loop.run_in_executor(None, lambda: tagger.tag_files(items))
+        return {"status": "success", **summary}
     except Exception as e:
         return JSONResponse(
             {"error": str(e)}, 
@@ -718,9 +1084,6 @@ async def download_file(filename: str):
 @app.get("/api/download-album/{base_filename}")
 async def download_album(base_filename: str):
     """Download Album als ZIP-Datei"""
-    import zipfile
-    import tempfile
-    
     # Finde alle Dateien die zu diesem Album gehören
     base_name = Path(base_filename).stem.replace('_track_', '').split('_track_')[0]
     album_files = []
@@ -740,26 +1103,22 @@ async def download_album(base_filename: str):
             status_code=404
         )
     
-    # Erstelle ZIP-Datei
-    zip_filename = f"{base_name}_album.zip"
-    zip_path = RECORDINGS_DIR / zip_filename
-    
-    try:
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for file in album_files:
-                zipf.write(file, file.name)
-        
-        return FileResponse(
-            str(zip_path),
-            media_type="application/zip",
-            filename=zip_filename,
-            headers={"Content-Disposition": f'attachment; filename="{zip_filename}"'}
-        )
-    except Exception as e:
+    job = await jobs.wait(jobs.submit("album_zip", base_filename=base_filename).id)
+    if job is None:
+        return JSONResponse({"error": "Job nicht gefunden"}, status_code=404)
+    if job.state != "done":
         return JSONResponse(
-            {"error": f"Fehler beim Erstellen der ZIP-Datei: {e}"}, 
+            {"error": f"Fehler beim Erstellen der ZIP-Datei: {job.error}"}, 
             status_code=500
         )
+    
+    zip_filename = job.result["zip_filename"]
+    return FileResponse(
+        str(RECORDINGS_DIR / zip_filename),
+        media_type="application/zip",
+        filename=zip_filename,
+        headers={"Content-Disposition": f'attachment; filename="{zip_filename}"'}
+    )
 
 @app.delete("/api/delete/{filename}")
 async def delete_recording(filename: str):
@@ -781,6 +1140,7 @@ async def delete_recording(filename: str):
     if filepath.exists():
         try:
             filepath.unlink()
+            splitter.remove_analysis(filepath)
             print(f"✓ Datei gelöscht: {decoded_filename}")
             return {"status": "deleted", "filename": decoded_filename}
         except Exception as e:
@@ -829,6 +1189,7 @@ async def delete_album(base_filename: str):
     for file in track_files:
         try:
             file.unlink()
+            splitter.remove_analysis(file)
             deleted_files.append(file.name)
         except Exception as e:
             errors.append(f"Fehler beim Löschen von {file.name}: {e}")
@@ -841,6 +1202,7 @@ async def delete_album(base_filename: str):
             if file.suffix.lower() in ['.flac', '.wav', '.mp3']:
                 try:
                     file.unlink()
+                    splitter.remove_analysis(file)
                     deleted_files.append(file.name)
                 except Exception as e:
                     errors.append(f"Fehler beim Löschen von {file.name}: {e}")
@@ -1020,6 +1382,11 @@ async def update_settings(
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
+    # Zuletzt gesendete Version je Job - beim Verbinden nur laufende Jobs melden
+    sent_versions = {job.id: job.version for job in jobs.list() if not job.is_active()}
+    # Bereits gesendete vorläufige Split-Punkte der laufenden Aufnahme
+    sent_splits = 0
+    split_recording = None
     try:
         while True:
             if recorder and recorder.is_recording():
@@ -1028,6 +1395,24 @@ async def websocket_endpoint(websocket: WebSocket):
                     "type": "level",
                     "value": level
                 })
+                if recorder.filename != split_recording:
+                    split_recording = recorder.filename
+                    sent_splits = 0
+                split_points = list(recorder.split_points)
+                for index in range(sent_splits, len(split_points)):
+                    await websocket.send_json({
+                        "type": "split_point",
+                        "index": index,
+                        "time": split_points[index]
+                    })
+                sent_splits = len(split_points)
+            for job in jobs.list():
+                if sent_versions.get(job.id) != job.version:
+                    sent_versions[job.id] = job.version
+                    await websocket.send_json({
+                        "type": "job",
+                        "job": job.to_dict()
+                    })
             await asyncio.sleep(0.1)
     except WebSocketDisconnect:
         pass
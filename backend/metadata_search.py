@@ -1,177 +1,500 @@
 import requests
-import json
+import asyncio
+import sqlite3
+import threading
 from typing import List, Dict, Optional, Any
 from pathlib import Path
+from urllib.parse import urlparse
+import math
 import time
+from track_alignment import align_tracks
+
+class RateLimiter:
+    """Thread-sicherer Token-Bucket für sync- und asyncio-Aufrufer
+
+    Ein Token wird erst genommen, wenn es verfügbar ist: Aufrufer schlafen bis
+    zum nächsten Token und versuchen es dann erneut. Abgebrochene Wartende
+    (z.B. geschlossene SSE-Verbindungen) verbrauchen dadurch keinen Slot.
+    """
+    
+    def __init__(self, rate: float = 1.0, burst: int = 1):
+        self.rate = rate  # Requests pro Sekunde
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def try_acquire(self) -> float:
+        """Nimm ein Token falls verfügbar (0.0), sonst Wartezeit bis zum nächsten Token"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+    
+    def wait(self):
+        delay = self.try_acquire()
+        while delay > 0:
+            time.sleep(delay)
+            delay = self.try_acquire()
+    
+    async def wait_async(self):
+        delay = self.try_acquire()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self.try_acquire()
+
+# MusicBrainz erlaubt max. 1 Request pro Sekunde - ein Limiter für den ganzen Prozess
+MUSICBRAINZ_LIMITER = RateLimiter(rate=1.0, burst=1)
+
+class ResponseCache:
+    """Persistenter HTTP-Cache (SQLite) für MusicBrainz- und Cover-Art-Antworten
+
+    Schlüssel ist URL + sortierte Parameter. Jeder Eintrag hat eine TTL; nach
+    Ablauf darf er noch stale_seconds lang ausgeliefert werden, während im
+    Hintergrund neu geladen wird (stale-while-revalidate). Bilder werden per
+    LRU auf max_image_bytes begrenzt, JSON-Antworten sind klein und bleiben.
+
+    Zugriffszeiten werden nur grob (ACCESS_RESOLUTION) und gesammelt beim
+    nächsten put() geschrieben - ein Cache-Treffer ist damit ein reines SELECT.
+    """
+    
+    DEFAULT_STALE_SECONDS = 7 * 24 * 3600
+    ACCESS_RESOLUTION = 3600  # Sekunden - genauer braucht die LRU-Reihenfolge nicht zu sein
+    
+    def __init__(self, db_path: Path, max_image_bytes: int = 200 * 1024 * 1024,
+                 stale_seconds: float = DEFAULT_STALE_SECONDS):
+        self.db_path = Path(db_path)
+        self.max_image_bytes = max_image_bytes
+        self.stale_seconds = stale_seconds
+        self._lock = threading.Lock()
+        self._pending_access = {}  # key -> accessed_at, noch nicht geschrieben
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                content BLOB NOT NULL,
+                content_type TEXT,
+                is_image INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (is_image, accessed_at)")
+        self._conn.commit()
+    
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict] = None) -> str:
+        if not params:
+            return url
+        return url + "?" + "&".join(f"{k}={params[k]}" for k in sorted(params))
+    
+    def get(self, key: str):
+        """Eintrag als (status, content, content_type, expires_at) oder None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, content, content_type, expires_at, accessed_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[4] >= self.ACCESS_RESOLUTION:
+                self._pending_access[key] = now
+        return row[:4]
+    
+    def _flush_access(self):
+        """Gesammelte Zugriffszeiten schreiben (innerhalb der laufenden Transaktion)"""
+        if self._pending_access:
+            self._conn.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._pending_access.items()]
+            )
+            self._pending_access.clear()
+    
+    def put(self, key: str, status: int, content: bytes, content_type: Optional[str], ttl: float):
+        is_image = bool(content_type and content_type.startswith("image/"))
+        now = time.time()
+        with self._lock:
+            self._flush_access()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, status, content, content_type, int(is_image), len(content), now + ttl, now)
+            )
+            if is_image:
+                self._evict_images()
+            self._conn.commit()
+    
+    def _evict_images(self):
+        """Älteste Bilder löschen, bis das Größenlimit wieder eingehalten wird"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses WHERE is_image = 1").fetchone()[0]
+        if total <= self.max_image_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT key, size FROM responses WHERE is_image = 1 ORDER BY accessed_at"
+        ).fetchall()
+        evict = []
+        for key, size in rows:
+            if total <= self.max_image_bytes:
+                break
+            evict.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evict)
+    
+    def clear(self):
+        with self._lock:
+            self._pending_access.clear()
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
 
 class MetadataSearcher:
     """Sucht nach Album-Metadaten über MusicBrainz API"""
     
-    def __init__(self):
-        self.musicbrainz_base = "https://musicbrainz.org/ws/2"
-        self.coverart_base = "https://coverartarchive.org"
+    # Cache-Lebensdauer (Sekunden) je Art der Antwort
+    SEARCH_TTL = 24 * 3600
+    LOOKUP_TTL = 7 * 24 * 3600
+    IMAGE_TTL = 30 * 24 * 3600
+    NOT_FOUND_TTL = 24 * 3600
+    RELEASE_INC = "recordings+media+artist-credits"
+    
+    def __init__(self, musicbrainz_base: str = "https://musicbrainz.org/ws/2",
+                 coverart_base: str = "https://coverartarchive.org",
+                 cache: Optional[ResponseCache] = None, index=None):
+        self.musicbrainz_base = musicbrainz_base.rstrip("/")
+        self.coverart_base = coverart_base.rstrip("/")
         self.headers = {
             "User-Agent": "VinylDigitalizer/1.0 (https://github.com/rototom/vinyl)",
             "Accept": "application/json"
         }
+        self.limiter = MUSICBRAINZ_LIMITER
+        self.session = requests.Session()
+        self.cache = cache
+        # Optionaler lokaler Release-Index (release_index.ReleaseIndex) - wird zuerst gefragt
+        self.index = index
+        self._revalidating = set()
+        self._revalidating_lock = threading.Lock()
+    
+    def _is_rate_limited(self, url: str) -> bool:
+        """Nur MusicBrainz ist limitiert, das Cover Art Archive nicht"""
+        host = urlparse(url).hostname or ""
+        return host == urlparse(self.musicbrainz_base).hostname or host.endswith(".musicbrainz.org")
+    
+    def _ttl_for(self, params: Optional[Dict], response: requests.Response) -> Optional[float]:
+        """TTL für eine Antwort - None = nicht cachen"""
+        if response.status_code == 404:
+            return self.NOT_FOUND_TTL
+        if response.status_code != 200:
+            return None
+        if response.headers.get("Content-Type", "").startswith("image/"):
+            return self.IMAGE_TTL
+        if params and "query" in params:
+            return self.SEARCH_TTL
+        return self.LOOKUP_TTL
     
-    def search_album(self, artist: str, album: str) -> List[Dict[str, Any]]:
-        """Suche nach Album in MusicBrainz"""
+    def _cached_response(self, url: str, params: Optional[Dict], key: str):
+        """Antwort aus dem Cache (inkl. Revalidierung abgelaufener Einträge) oder None"""
+        if self.cache is None:
+            return None
         try:
-            # MusicBrainz-Suche
-            query = f'artist:"{artist}" AND release:"{album}"'
-            url = f"{self.musicbrainz_base}/release"
-            params = {
-                "query": query,
-                "fmt": "json",
-                "limit": 10
-            }
-            
-            print(f"Suche MusicBrainz: {query}")
-            response = requests.get(url, params=params, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            releases = []
-            
-            for release in data.get("releases", []):
-                release_info = {
-                    "mbid": release.get("id"),
-                    "title": release.get("title"),
-                    "artist": release.get("artist-credit", [{}])[0].get("name", "") if release.get("artist-credit") else "",
-                    "date": release.get("date", ""),
-                    "country": release.get("country", ""),
-                    "track_count": release.get("track-count", 0),
-                    "media": []
-                }
-                
-                # Hole detaillierte Informationen
+            entry = self.cache.get(key)
+        except sqlite3.Error as e:
+            print(f"Fehler beim Lesen des Metadaten-Caches: {e}")
+            return None
+        if entry is None:
+            return None
+        status, content, content_type, expires_at = entry
+        age_past_expiry = time.time() - expires_at
+        if age_past_expiry > self.cache.stale_seconds:
+            return None
+        if age_past_expiry > 0:
+            self._revalidate(url, params, key)
+        response = requests.Response()
+        response.status_code = status
+        response._content = content
+        response.url = url
+        if content_type:
+            response.headers["Content-Type"] = content_type
+        return response
+    
+    def _revalidate(self, url: str, params: Optional[Dict], key: str):
+        """Abgelaufenen Eintrag im Hintergrund neu laden (pro Schlüssel nur einmal)"""
+        with self._revalidating_lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+        
+        def refresh():
+            try:
+                if self._is_rate_limited(url):
+                    self.limiter.wait()
+                self._fetch(url, params, key, 10)
+            except Exception as e:
+                print(f"Fehler beim Aktualisieren des Caches für {url}: {e}")
+            finally:
+                with self._revalidating_lock:
+                    self._revalidating.discard(key)
+        
+        threading.Thread(target=refresh, daemon=True).start()
+    
+    def _fetch(self, url: str, params: Optional[Dict], key: str, timeout: float) -> requests.Response:
+        """Netzwerk-Request ohne Limiter, Ergebnis in den Cache schreiben"""
+        response = self.session.get(url, params=params, headers=self.headers, timeout=timeout)
+        if self.cache is not None:
+            ttl = self._ttl_for(params, response)
+            if ttl is not None:
                 try:
-                    detail_url = f"{self.musicbrainz_base}/release/{release_info['mbid']}"
-                    detail_params = {
-                        "inc": "recordings+media",
-                        "fmt": "json"
-                    }
-                    detail_response = requests.get(detail_url, params=detail_params, headers=self.headers, timeout=10)
-                    detail_response.raise_for_status()
-                    detail_data = detail_response.json()
-                    
-                    # Extrahiere Media-Informationen (LP-Seiten/Discs)
-                    total_tracks_all_media = 0
-                    for medium in detail_data.get("media", []):
-                        medium_info = {
-                            "position": medium.get("position", 1),
-                            "format": medium.get("format", ""),
-                            "track_count": medium.get("track-count", 0),
-                            "title": medium.get("title", ""),  # z.B. "Side A", "Side B"
-                            "tracks": []
-                        }
-                        
-                        for track in medium.get("tracks", []):
-                            recording = track.get("recording", {})
-                            track_info = {
-                                "position": track.get("position", 0),
-                                "title": recording.get("title", "") if recording else track.get("title", ""),
-                                "length": track.get("length", 0)  # in Millisekunden
-                            }
-                            medium_info["tracks"].append(track_info)
-                        
-                        total_tracks_all_media += medium_info["track_count"]
-                        release_info["media"].append(medium_info)
-                    
-                    # Berechne Gesamt-Informationen
-                    release_info["total_tracks_all_media"] = total_tracks_all_media
-                    release_info["media_count"] = len(release_info["media"])
-                    
-                    # Gruppiere Media nach Disc (bei Multi-Disc-Alben)
-                    # Bei Vinyl: Jede 2 Media = 1 Disc (Side A + Side B)
-                    vinyl_media = [m for m in release_info["media"] if m.get("format", "").lower() in ["vinyl", "12\"", "lp", ""]]
-                    if vinyl_media:
-                        # Bei Vinyl: 2 Seiten = 1 Disc
-                        release_info["disc_count"] = (len(vinyl_media) + 1) // 2
-                    else:
-                        release_info["disc_count"] = len(release_info["media"])
-                    
-                    # Hole Cover-Art
-                    try:
-                        cover_url = f"{self.coverart_base}/release/{release_info['mbid']}"
-                        cover_response = requests.get(cover_url, headers=self.headers, timeout=5)
-                        if cover_response.status_code == 200:
-                            cover_data = cover_response.json()
-                            images = cover_data.get("images", [])
-                            if images:
-                                # Verwende erstes Front-Cover oder erstes Bild
-                                front_cover = next((img for img in images if img.get("front", False)), images[0])
-                                release_info["cover_url"] = front_cover.get("image", "")
-                    except Exception as e:
-                        print(f"Fehler beim Laden des Covers: {e}")
-                    
-                    # Rate-Limiting: MusicBrainz erlaubt max 1 Request pro Sekunde
-                    time.sleep(1.1)
-                    
-                except Exception as e:
-                    print(f"Fehler beim Laden der Details für {release_info['mbid']}: {e}")
-                    continue
-                
-                releases.append(release_info)
-            
-            return releases
-            
+                    self.cache.put(key, response.status_code, response.content,
+                                   response.headers.get("Content-Type"), ttl)
+                except sqlite3.Error as e:
+                    print(f"Fehler beim Schreiben des Metadaten-Caches: {e}")
+        return response
+    
+    def _get(self, url: str, params: Optional[Dict] = None, timeout: float = 10) -> requests.Response:
+        """GET mit Cache und Rate-Limiting für MusicBrainz (blockierend)"""
+        key = ResponseCache.make_key(url, params)
+        cached = self._cached_response(url, params, key)
+        if cached is not None:
+            return cached
+        if self._is_rate_limited(url):
+            self.limiter.wait()
+        return self._fetch(url, params, key, timeout)
+    
+    async def _get_async(self, url: str, params: Optional[Dict] = None, timeout: float = 10) -> requests.Response:
+        """GET im Thread-Pool - wartet auf den Limiter, ohne den Event-Loop zu blockieren"""
+        key = ResponseCache.make_key(url, params)
+        cached = await asyncio.to_thread(self._cached_response, url, params, key)
+        if cached is not None:
+            return cached
+        if self._is_rate_limited(url):
+            await self.limiter.wait_async()
+        return await asyncio.to_thread(self._fetch, url, params, key, timeout)
+    
+    def get_release(self, release_mbid: str, inc: str = RELEASE_INC) -> Dict[str, Any]:
+        """Release-Details - aus dem lokalen Index, sonst von MusicBrainz"""
+        local = self._local_release(release_mbid)
+        if local is not None:
+            return local
+        response = self._get(f"{self.musicbrainz_base}/release/{release_mbid}", params={"inc": inc, "fmt": "json"})
+        response.raise_for_status()
+        return response.json()
+    
+    def _local_release(self, release_mbid: str) -> Optional[Dict[str, Any]]:
+        if self.index is None:
+            return None
+        try:
+            return self.index.get_release(release_mbid)
+        except sqlite3.Error as e:
+            print(f"Fehler beim Lesen des lokalen Index: {e}")
+            return None
+    
+    def get_front_cover(self, release_mbid: str) -> Optional[bytes]:
+        """Front-Cover aus dem Cover Art Archive (None, wenn keines vorhanden)"""
+        response = self._get(f"{self.coverart_base}/release/{release_mbid}/front")
+        if response.status_code != 200:
+            return None
+        return response.content
+    
+    async def search_album(self, artist: str, album: str) -> List[Dict[str, Any]]:
+        """Suche nach Album in MusicBrainz - komplett mit Details aller Treffer
+
+        Details werden für alle Treffer gleichzeitig angefragt: MusicBrainz-Requests
+        reihen sich über den gemeinsamen Limiter ein, die Cover-Art-Requests laufen
+        ohne Limit parallel dazu.
+        """
+        try:
+            releases = await self.search_releases(artist, album)
+            detailed = await asyncio.gather(*(self._load_release_details(release) for release in releases))
+            return [release for release in detailed if release is not None]
         except Exception as e:
             print(f"Fehler bei MusicBrainz-Suche: {e}")
             return []
     
-    def match_album(self, found_tracks: List[Dict], album_releases: List[Dict], 
-                   total_duration: float, tracks_per_side: Optional[int] = None) -> Optional[Dict]:
-        """Finde das beste passende Album basierend auf Track-Anzahl und Länge"""
-        best_match = None
-        best_score = 0
+    async def search_releases(self, artist: str, album: str) -> List[Dict[str, Any]]:
+        """MusicBrainz-Suche - nur die Treffer ohne Details, nach Such-Score sortiert"""
+        if self.index is not None:
+            try:
+                local = await asyncio.to_thread(self.index.search, artist, album)
+            except sqlite3.Error as e:
+                print(f"Fehler bei der Suche im lokalen Index: {e}")
+                local = []
+            if local:
+                print(f"Lokaler Index: {len(local)} Treffer für {artist} - {album}")
+                return local
         
-        for release in album_releases:
-            score = 0
-            
-            # Prüfe Track-Anzahl pro Medium (LP-Seite)
-            if release.get("media"):
-                for medium in release["media"]:
-                    medium_track_count = medium.get("track_count", 0)
-                    
-                    # Wenn tracks_per_side angegeben ist, vergleiche damit
-                    if tracks_per_side:
-                        if medium_track_count == tracks_per_side:
-                            score += 50
-                        elif abs(medium_track_count - tracks_per_side) <= 1:
-                            score += 30
-                    else:
-                        # Vergleiche mit gefundenen Tracks
-                        if medium_track_count == len(found_tracks):
-                            score += 50
-                        elif abs(medium_track_count - len(found_tracks)) <= 1:
-                            score += 30
-                    
-                    # Prüfe Gesamtlänge der Tracks im Medium
-                    medium_duration = sum(t.get("length", 0) / 1000.0 for t in medium.get("tracks", []))
-                    if medium_duration > 0:
-                        duration_diff = abs(medium_duration - total_duration)
-                        duration_ratio = duration_diff / total_duration if total_duration > 0 else 1
-                        if duration_ratio < 0.1:  # Weniger als 10% Unterschied
-                            score += 40
-                        elif duration_ratio < 0.2:  # Weniger als 20% Unterschied
-                            score += 20
+        query = f'artist:"{artist}" AND release:"{album}"'
+        url = f"{self.musicbrainz_base}/release"
+        params = {
+            "query": query,
+            "fmt": "json",
+            "limit": 10
+        }
+        
+        print(f"Suche MusicBrainz: {query}")
+        response = await self._get_async(url, params=params)
+        response.raise_for_status()
+        
+        releases = []
+        for release in response.json().get("releases", []):
+            releases.append({
+                "mbid": release.get("id"),
+                "title": release.get("title"),
+                "artist": release.get("artist-credit", [{}])[0].get("name", "") if release.get("artist-credit") else "",
+                "date": release.get("date", ""),
+                "country": release.get("country", ""),
+                "track_count": release.get("track-count", 0),
+                "search_score": release.get("score", 0),  # Vorläufiger Score der MusicBrainz-Suche
+                "media": []
+            })
+        releases.sort(key=lambda r: r["search_score"], reverse=True)
+        return releases
+    
+    async def iter_release_details(self, releases: List[Dict[str, Any]]):
+        """Liefere Treffer mit Details in Ankunftsreihenfolge (async Generator)
+
+        Die Requests werden in der Reihenfolge der Liste gestartet - über den
+        Limiter kommen die bestplatzierten Treffer dadurch zuerst an.
+        Fehlgeschlagene Treffer werden als {"mbid": ..., "error": ...} geliefert.
+        """
+        async def load(release):
+            return release["mbid"], await self._load_release_details(release)
+        
+        tasks = [asyncio.create_task(load(release)) for release in releases]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                mbid, detailed = await next_done
+                yield detailed if detailed is not None else {"mbid": mbid, "error": "Details konnten nicht geladen werden"}
+        finally:
+            # Client hat die Verbindung getrennt - offene Requests nicht mehr abwarten
+            for task in tasks:
+                task.cancel()
+    
+    async def _load_release_details(self, release_info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Media/Tracks und Cover-URL eines Treffers laden (None bei Fehler)"""
+        detail_url = f"{self.musicbrainz_base}/release/{release_info['mbid']}"
+        # Gleiche Parameter wie get_release, damit das spätere Taggen den Cache trifft
+        detail_params = {
+            "inc": self.RELEASE_INC,
+            "fmt": "json"
+        }
+        local = await asyncio.to_thread(self._local_release, release_info["mbid"])
+        detail_request = self._get_async(detail_url, params=detail_params) if local is None else asyncio.sleep(0, local)
+        detail_result, cover_url = await asyncio.gather(
+            detail_request,
+            self._load_cover_url(release_info["mbid"]),
+            return_exceptions=True
+        )
+        try:
+            if isinstance(detail_result, Exception):
+                raise detail_result
+            if local is None:
+                detail_result.raise_for_status()
+                detail_result = detail_result.json()
+            self._apply_details(release_info, detail_result)
+        except Exception as e:
+            print(f"Fehler beim Laden der Details für {release_info['mbid']}: {e}")
+            return None
+        if isinstance(cover_url, str) and cover_url:
+            release_info["cover_url"] = cover_url
+        return release_info
+    
+    async def _load_cover_url(self, release_mbid: str) -> Optional[str]:
+        """URL des Front-Covers aus dem Cover Art Archive"""
+        try:
+            cover_response = await self._get_async(f"{self.coverart_base}/release/{release_mbid}", timeout=5)
+            if cover_response.status_code == 200:
+                images = cover_response.json().get("images", [])
+                if images:
+                    # Verwende erstes Front-Cover oder erstes Bild
+                    front_cover = next((img for img in images if img.get("front", False)), images[0])
+                    return front_cover.get("image", "")
+        except Exception as e:
+            print(f"Fehler beim Laden des Covers: {e}")
+        return None
+    
+    def _apply_details(self, release_info: Dict[str, Any], detail_data: Dict[str, Any]):
+        """Übernimm Media-Informationen (LP-Seiten/Discs) aus den Release-Details"""
+        total_tracks_all_media = 0
+        for medium in detail_data.get("media", []):
+            medium_info = {
+                "position": medium.get("position", 1),
+                "format": medium.get("format", ""),
+                "track_count": medium.get("track-count", 0),
+                "title": medium.get("title", ""),  # z.B. "Side A", "Side B"
+                "tracks": []
+            }
             
-            # Bonus für Vinyl-Format
-            if any(m.get("format", "").lower() in ["vinyl", "12\"", "lp"] for m in release.get("media", [])):
-                score += 10
+            for track in medium.get("tracks", []):
+                recording = track.get("recording", {})
+                track_info = {
+                    "position": track.get("position", 0),
+                    "title": recording.get("title", "") if recording else track.get("title", ""),
+                    "length": track.get("length", 0)  # in Millisekunden
+                }
+                medium_info["tracks"].append(track_info)
             
-            if score > best_score:
-                best_score = score
-                best_match = release
+            total_tracks_all_media += medium_info["track_count"]
+            release_info["media"].append(medium_info)
+        
+        # Berechne Gesamt-Informationen
+        release_info["total_tracks_all_media"] = total_tracks_all_media
+        release_info["media_count"] = len(release_info["media"])
+        
+        # Gruppiere Media nach Disc (bei Multi-Disc-Alben)
+        # Bei Vinyl: Jede 2 Media = 1 Disc (Side A + Side B)
+        vinyl_media = [m for m in release_info["media"] if m.get("format", "").lower() in ["vinyl", "12\"", "lp", ""]]
+        if vinyl_media:
+            # Bei Vinyl: 2 Seiten = 1 Disc
+            release_info["disc_count"] = (len(vinyl_media) + 1) // 2
+        else:
+            release_info["disc_count"] = len(release_info["media"])
+    
+    @staticmethod
+    def release_track_lengths(release: Dict) -> List[Optional[float]]:
+        """Track-Längen eines Releases in Sekunden, über alle Media in Reihenfolge (None = unbekannt)"""
+        lengths = []
+        for medium in sorted(release.get("media", []), key=lambda m: m.get("position", 0)):
+            for track in sorted(medium.get("tracks", []), key=lambda t: t.get("position", 0)):
+                length = track.get("length")
+                lengths.append(length / 1000.0 if length else None)
+        return lengths
+    
+    def rank_releases(self, releases: List[Dict], durations: List[float]) -> List[Dict[str, Any]]:
+        """Bewerte Releases gegen die Track-Längen einer Aufnahme - alle in einem Alignment-Durchgang
+
+        Gibt pro Release {"mbid", "score", "confidence"} zurück, bester zuerst.
+        score (0..100) fällt mit den Alignment-Kosten pro Track; Releases ohne
+        bekannte Track-Längen bekommen score None und stehen am Ende.
+        """
+        lengths = [self.release_track_lengths(release) for release in releases]
+        candidates = [index for index, release_lengths in enumerate(lengths) if any(release_lengths)]
+        unscored = [
+            {"mbid": release["mbid"], "score": None, "confidence": None}
+            for index, release in enumerate(releases) if index not in candidates or not durations
+        ]
+        if not candidates or not durations:
+            return unscored
         
-        return best_match if best_score >= 30 else None  # Mindest-Score von 30
+        alignments = align_tracks(durations, [lengths[index] for index in candidates])
+        scored = [
+            {
+                "mbid": releases[index]["mbid"],
+                "score": round(100 * math.exp(-alignment["cost"] / len(durations) / 2)),
+                "confidence": round(alignment["confidence"], 3)
+            }
+            for index, alignment in zip(candidates, alignments)
+        ]
+        return sorted(scored, key=lambda entry: entry["score"], reverse=True) + unscored
     
     def download_cover(self, cover_url: str, output_path: Path):
         """Lade Cover-Art herunter"""
         try:
-            response = requests.get(cover_url, timeout=10)
+            response = self._get(cover_url, timeout=10)
             response.raise_for_status()
             output_path.write_bytes(response.content)
             return True
@@ -13,7 +13,8 @@ class RecordingState:
             "filename": None,
             "start_time": None,
             "recorder_type": None,  # "pyaudio" oder "alsa"
-            "device": None
+            "device": None,
+            "release_mbid": None  # Vorausgewähltes Release für das automatische Taggen
         }
         self.load()
     
@@ -30,7 +31,8 @@ class RecordingState:
                     "filename": None,
                     "start_time": None,
                     "recorder_type": None,
-                    "device": None
+                    "device": None,
+                    "release_mbid": None
                 }
         return self.state
     
@@ -43,14 +45,15 @@ class RecordingState:
         except Exception as e:
             print(f"Fehler beim Speichern des Aufnahme-Status: {e}")
     
-    def start_recording(self, filename: str, recorder_type: str, device: Any = None):
+    def start_recording(self, filename: str, recorder_type: str, device: Any = None, release_mbid: Optional[str] = None):
         """Markiere Aufnahme als gestartet"""
         self.state = {
             "is_recording": True,
             "filename": filename,
             "start_time": datetime.now().isoformat(),
             "recorder_type": recorder_type,
-            "device": str(device) if device is not None else None
+            "device": str(device) if device is not None else None,
+            "release_mbid": release_mbid
         }
         self.save()
     
@@ -61,7 +64,8 @@ class RecordingState:
             "filename": None,
             "start_time": None,
             "recorder_type": None,
-            "device": None
+            "device": None,
+            "release_mbid": None
         }
         self.save()
     
@@ -72,5 +76,9 @@ class RecordingState:
     def get_filename(self) -> Optional[str]:
         """Hole Dateiname der aktuellen Aufnahme"""
         return self.state.get("filename")
+    
+    def get_release_mbid(self) -> Optional[str]:
+        """Hole das vorausgewählte MusicBrainz-Release der aktuellen Aufnahme"""
+        return self.state.get("release_mbid")
 
 
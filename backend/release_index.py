@@ -0,0 +1,265 @@
+import argparse
+import bz2
+import gzip
+import json
+import lzma
+import sqlite3
+import tarfile
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Iterator
+
+class ReleaseIndex:
+    """Lokaler Release-Index (SQLite + FTS5) für Offline-Suchen
+
+    Wird aus einem MusicBrainz-JSON-Dump (oder einem selbst erstellten
+    Auszug im gleichen Format) befüllt: ein Release-Objekt pro Zeile, wie es
+    die Web-API mit inc=recordings+media+artist-credits liefert.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS releases (
+                mbid TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                artist TEXT NOT NULL,
+                artist_credit TEXT NOT NULL,
+                date TEXT,
+                country TEXT,
+                track_count INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS media (
+                release_mbid TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                format TEXT,
+                title TEXT,
+                track_count INTEGER NOT NULL,
+                PRIMARY KEY (release_mbid, position)
+            );
+            CREATE TABLE IF NOT EXISTS tracks (
+                release_mbid TEXT NOT NULL,
+                medium_position INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                title TEXT,
+                length INTEGER,
+                PRIMARY KEY (release_mbid, medium_position, position)
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS releases_fts USING fts5(
+                mbid UNINDEXED, title, artist, tokenize = 'unicode61 remove_diacritics 2'
+            );
+        """)
+        self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM releases").fetchone()[0]
+
+    def add_releases(self, releases) -> int:
+        """Releases (MusicBrainz-JSON) einfügen oder ersetzen, in einer Transaktion"""
+        added = 0
+        with self._lock:
+            with self._conn:
+                for release in releases:
+                    if release.get("id") and release.get("title"):
+                        self._insert(release)
+                        added += 1
+        return added
+
+    def _insert(self, release: Dict[str, Any]):
+        mbid = release["id"]
+        credit = [
+            {"name": c.get("name") or (c.get("artist") or {}).get("name", ""), "joinphrase": c.get("joinphrase", "")}
+            for c in release.get("artist-credit", [])
+        ]
+        # Für die Volltextsuche der komplette Credit ("A feat. B"), fürs Taggen bleibt die Liste erhalten
+        artist = "".join(c["name"] + c["joinphrase"] for c in credit)
+        media = release.get("media", [])
+        track_count = sum(m.get("track-count", len(m.get("tracks", []))) for m in media)
+
+        for table, column in (("tracks", "release_mbid"), ("media", "release_mbid"), ("releases_fts", "mbid")):
+            self._conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (mbid,))
+        self._conn.execute(
+            "INSERT OR REPLACE INTO releases VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (mbid, release["title"], artist, json.dumps(credit, ensure_ascii=False),
+             release.get("date", ""), release.get("country", ""), track_count)
+        )
+        self._conn.execute("INSERT INTO releases_fts VALUES (?, ?, ?)", (mbid, release["title"], artist))
+
+        for index, medium in enumerate(media, 1):
+            position = medium.get("position", index)
+            tracks = medium.get("tracks", [])
+            self._conn.execute(
+                "INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?)",
+                (mbid, position, medium.get("format") or "", medium.get("title") or "",
+                 medium.get("track-count", len(tracks)))
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?)",
+                [
+                    (mbid, position, track.get("position", track_index),
+                     (track.get("recording") or {}).get("title") or track.get("title", ""),
+                     track.get("length") or (track.get("recording") or {}).get("length") or 0)
+                    for track_index, track in enumerate(tracks, 1)
+                ]
+            )
+
+    def import_dump(self, dump_path: Path, batch_size: int = 1000, progress_callback=None) -> int:
+        """Importiere einen Dump (JSON-Lines, JSON-Array, .gz/.bz2/.xz oder MusicBrainz-tar.xz)"""
+        imported = 0
+        batch = []
+        for release in iter_dump(Path(dump_path)):
+            batch.append(release)
+            if len(batch) >= batch_size:
+                imported += self.add_releases(batch)
+                batch = []
+                if progress_callback:
+                    progress_callback(imported)
+        if batch:
+            imported += self.add_releases(batch)
+            if progress_callback:
+                progress_callback(imported)
+        return imported
+
+    @staticmethod
+    def _fts_query(artist: str, album: str) -> Optional[str]:
+        """FTS5-Query: alle Wörter müssen in der jeweiligen Spalte vorkommen"""
+        terms = []
+        for column, text in (("artist", artist), ("title", album)):
+            for word in (text or "").split():
+                terms.append(f'{column}:"' + word.replace('"', '""') + '"')
+        return " AND ".join(terms) if terms else None
+
+    def search(self, artist: str, album: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Volltextsuche - Treffer im Format von MetadataSearcher.search_releases"""
+        query = self._fts_query(artist, album)
+        if query is None:
+            return []
+        try:
+            with self._lock:
+                rows = self._conn.execute("""
+                    SELECT r.mbid, r.title, r.artist_credit, r.date, r.country, r.track_count
+                    FROM releases_fts f JOIN releases r ON r.mbid = f.mbid
+                    WHERE releases_fts MATCH ?
+                    ORDER BY bm25(releases_fts)
+                    LIMIT ?
+                """, (query, limit)).fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"Fehler bei der Suche im lokalen Index: {e}")
+            return []
+        releases = []
+        for rank, (mbid, title, artist_credit, date, country, track_count) in enumerate(rows):
+            credit = json.loads(artist_credit)
+            releases.append({
+                "mbid": mbid,
+                "title": title,
+                "artist": credit[0]["name"] if credit else "",
+                "date": date or "",
+                "country": country or "",
+                "track_count": track_count,
+                "search_score": 100 - rank,  # Reihenfolge nach bm25
+                "source": "local",
+                "media": []
+            })
+        return releases
+
+    def get_release(self, mbid: str) -> Optional[Dict[str, Any]]:
+        """Release im Format der MusicBrainz-API (inc=recordings+media+artist-credits) oder None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT title, artist_credit, date, country FROM releases WHERE mbid = ?", (mbid,)
+            ).fetchone()
+            if row is None:
+                return None
+            media_rows = self._conn.execute(
+                "SELECT position, format, title, track_count FROM media WHERE release_mbid = ? ORDER BY position",
+                (mbid,)
+            ).fetchall()
+            track_rows = self._conn.execute(
+                "SELECT medium_position, position, title, length FROM tracks WHERE release_mbid = ? ORDER BY medium_position, position",
+                (mbid,)
+            ).fetchall()
+
+        title, artist_credit, date, country = row
+        media = {
+            position: {"position": position, "format": fmt, "title": medium_title, "track-count": count, "tracks": []}
+            for position, fmt, medium_title, count in media_rows
+        }
+        for medium_position, position, track_title, length in track_rows:
+            if medium_position in media:
+                media[medium_position]["tracks"].append({
+                    "position": position,
+                    "title": track_title,
+                    "length": length,
+                    "recording": {"title": track_title, "length": length}
+                })
+        return {
+            "id": mbid,
+            "title": title,
+            "artist-credit": json.loads(artist_credit),
+            "date": date or "",
+            "country": country or "",
+            "media": list(media.values())
+        }
+
+def _open_text(path: Path):
+    openers = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+    return openers.get(path.suffix, open)(path, "rt", encoding="utf-8")
+
+def _iter_lines(lines) -> Iterator[Dict[str, Any]]:
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def iter_dump(path: Path) -> Iterator[Dict[str, Any]]:
+    """Release-Objekte aus einem Dump lesen (streamend, außer bei JSON-Arrays)"""
+    if ".tar" in path.suffixes:
+        # Offizieller MusicBrainz-JSON-Dump: release.tar.xz mit mbdump/release
+        with tarfile.open(path) as archive:
+            for member in archive:
+                if member.isfile() and member.name.endswith("mbdump/release"):
+                    yield from _iter_lines(archive.extractfile(member))
+        return
+
+    with _open_text(path) as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        if first == "[":
+            # Eigener Auszug als JSON-Array
+            yield from json.loads(first + f.read())
+        else:
+            yield from _iter_lines([first + f.readline()] if first else [])
+            yield from _iter_lines(f)
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokaler MusicBrainz-Release-Index")
+    parser.add_argument("--db", type=Path, default=Path(__file__).parent.parent / "config" / "release_index.sqlite",
+                        help="Pfad zur Index-Datenbank")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="Dump importieren")
+    import_parser.add_argument("dump", type=Path, nargs="+")
+    search_parser = subparsers.add_parser("search", help="Im Index suchen")
+    search_parser.add_argument("artist")
+    search_parser.add_argument("album")
+    args = parser.parse_args()
+
+    index = ReleaseIndex(args.db)
+    if args.command == "import":
+        for dump in args.dump:
+            imported = index.import_dump(dump, progress_callback=lambda n: print(f"\r{dump.name}: {n} Releases", end="", flush=True))
+            print(f"\r✓ {dump.name}: {imported} Releases importiert")
+        print(f"Index enthält {index.count()} Releases ({args.db})")
+    else:
+        for release in index.search(args.artist, args.album):
+            print(f"{release['mbid']}  {release['artist']} - {release['title']} ({release['date']}, {release['track_count']} Tracks)")
+
+if __name__ == "__main__":
+    main()
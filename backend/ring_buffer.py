@@ -0,0 +1,60 @@
+import numpy as np
+
+class RingBuffer:
+    """Lock-freier Ringpuffer für genau einen Producer (Audio-Callback) und einen Consumer
+
+    Producer und Consumer schreiben jeweils nur ihren eigenen, monoton wachsenden
+    Zähler. Der Producer veröffentlicht neue Frames erst nach dem Kopieren, daher
+    braucht keine Seite ein Lock.
+    """
+
+    def __init__(self, capacity_frames: int, channels: int, dtype=np.int16):
+        self.capacity = int(capacity_frames)
+        self.channels = channels
+        self._buffer = np.zeros((self.capacity, channels), dtype=dtype)
+        self._write_pos = 0  # Nur vom Producer verändert
+        self._read_pos = 0  # Nur vom Consumer verändert
+        self.dropped_frames = 0  # Frames die wegen vollem Puffer verworfen wurden
+
+    def available(self) -> int:
+        """Anzahl lesbarer Frames"""
+        return self._write_pos - self._read_pos
+
+    def write(self, data: np.ndarray) -> int:
+        """Kopiere Frames in den Puffer (Producer-Seite)"""
+        n = len(data)
+        free = self.capacity - (self._write_pos - self._read_pos)
+        if n > free:
+            # Consumer kommt nicht hinterher - Überlauf zählen statt zu blockieren
+            self.dropped_frames += n - free
+            n = free
+        if n <= 0:
+            return 0
+
+        start = self._write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        self._buffer[start:start + first] = data[:first]
+        if first < n:
+            self._buffer[:n - first] = data[first:n]
+
+        # Erst nach dem Kopieren veröffentlichen
+        self._write_pos += n
+        return n
+
+    def read(self, max_frames: int = None):
+        """Lese verfügbare Frames als Kopie (Consumer-Seite), None wenn leer"""
+        n = self._write_pos - self._read_pos
+        if max_frames is not None:
+            n = min(n, max_frames)
+        if n <= 0:
+            return None
+
+        start = self._read_pos % self.capacity
+        first = min(n, self.capacity - start)
+        if first == n:
+            data = self._buffer[start:start + n].copy()
+        else:
+            data = np.concatenate((self._buffer[start:], self._buffer[:n - first]))
+
+        self._read_pos += n
+        return data
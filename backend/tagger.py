@@ -1,48 +1,177 @@
 from mutagen.flac import FLAC, Picture
 from pathlib import Path
 from PIL import Image
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
 import io
+import threading
 
 class AudioTagger:
+    def __init__(self, cover_cache_size: int = 16, padding: int = 512 * 1024, max_workers: int = 4):
+        # Fertig kodierte Cover (Picture-Blöcke), Schlüssel = SHA-256 des Quellbilds
+        self.cover_cache_size = cover_cache_size
+        self._cover_cache = OrderedDict()
+        self._lock = threading.Lock()
+        # Padding, das bei einem unvermeidbaren Neuschreiben reserviert wird
+        self.padding = padding
+        self.stats = {"in_place": 0, "rewrite": 0, "unchanged": 0}
+        # Parallele Tag-Writes (I/O-gebunden, daher Threads)
+        self.max_workers = max_workers
+    
     def tag_file(self, filepath: Path, title=None, artist=None, 
                  album=None, track_number=None, year=None, genre=None, 
                  cover_path=None, album_artist=None, disc_number=None, total_tracks=None):
-        """Füge Metadaten zu FLAC-Datei hinzu"""
+        """Füge Metadaten zu FLAC-Datei hinzu - geschrieben wird nur bei Änderungen
+
+        Gibt den Änderungsstatus zurück: geänderte Felder, ob geschrieben wurde
+        und ob der Write in-place war.
+        """
         audio = FLAC(str(filepath))
         
-        if title:
-            audio['TITLE'] = [title]
-        if artist:
-            audio['ARTIST'] = [artist]
-        if album_artist:
-            audio['ALBUMARTIST'] = [album_artist]
-        if album:
-            audio['ALBUM'] = [album]
-        if track_number:
-            audio['TRACKNUMBER'] = [str(track_number)]
-        if total_tracks:
-            audio['TRACKTOTAL'] = [str(total_tracks)]
-        if disc_number:
-            audio['DISCNUMBER'] = [str(disc_number)]
-        if year:
-            audio['DATE'] = [str(year)]
-        if genre:
-            audio['GENRE'] = [genre]
+        wanted = {
+            'TITLE': title,
+            'ARTIST': artist,
+            'ALBUMARTIST': album_artist,
+            'ALBUM': album,
+            'TRACKNUMBER': track_number,
+            'TRACKTOTAL': total_tracks,
+            'DISCNUMBER': disc_number,
+            'DATE': year,
+            'GENRE': genre
+        }
+        changed = []
+        for key, value in wanted.items():
+            if not value:
+                continue
+            # Vergleich mit den vorhandenen Vorbis-Kommentaren
+            if audio.get(key) != [str(value)]:
+                audio[key] = [str(value)]
+                changed.append(key)
         
-        # Füge Cover-Art hinzu
+        # Front-Cover ersetzen statt anhängen
         if cover_path and Path(cover_path).exists():
             try:
-                self._add_cover_art(audio, cover_path)
+                if self._set_front_cover(audio, cover_path):
+                    changed.append('COVER')
             except Exception as e:
                 print(f"Fehler beim Hinzufügen des Covers: {e}")
         
-        audio.save()
+        if not changed:
+            with self._lock:
+                self.stats["unchanged"] += 1
+            return {"changed": [], "written": False, "in_place": True}
+        
+        in_place = self._save(audio)
+        return {"changed": changed, "written": True, "in_place": in_place}
     
-    def _add_cover_art(self, audio: FLAC, cover_path: Path):
-        """Füge Cover-Art zu FLAC-Datei hinzu"""
+    def tag_files(self, items, progress_callback=None):
+        """Tagge mehrere Dateien parallel auf einem begrenzten Thread-Pool
+
+        items: Liste von (Pfad, Tags)-Paaren, Tags sind die Keyword-Argumente
+        von tag_file. Fehler einzelner Dateien brechen den Batch nicht ab.
+        Gibt die Ergebnisse in Eingabe-Reihenfolge plus Zusammenfassung zurück.
+        """
+        items = list(items)
+        results = [None] * len(items)
+        
+        # Jedes Cover einmal vorbereiten, bevor die Worker gleichzeitig danach fragen
+        for cover_path in {tags.get("cover_path") for _, tags in items if tags.get("cover_path")}:
+            try:
+                if Path(cover_path).exists():
+                    self._prepare_cover(cover_path)
+            except Exception as e:
+                print(f"Fehler beim Verarbeiten des Covers: {e}")
+        
+        executor = ThreadPoolExecutor(max_workers=max(1, self.max_workers), thread_name_prefix="tag")
+        try:
+            futures = {
+                executor.submit(self.tag_file, Path(path), **tags): index
+                for index, (path, tags) in enumerate(items)
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                index = futures[future]
+                filename = Path(items[index][0]).name
+                try:
+                    results[index] = {"filename": filename, **future.result()}
+                except Exception as e:
+                    print(f"Fehler beim Taggen von {filename}: {e}")
+                    results[index] = {"filename": filename, "error": str(e)}
+                if progress_callback:
+                    progress_callback(done / len(items))
+        finally:
+            # Bei Abbruch (z.B. Job abgebrochen) wartende Dateien nicht mehr taggen
+            executor.shutdown(wait=True, cancel_futures=True)
+        
+        written = [r for r in results if r and r.get("written")]
+        return {
+            "files": results,
+            "tagged": sum(1 for r in results if r and "error" not in r),
+            "unchanged": sum(1 for r in results if r and "error" not in r and not r.get("written")),
+            "in_place_writes": sum(1 for r in written if r["in_place"]),
+            "rewrites": sum(1 for r in written if not r["in_place"]),
+            "errors": sum(1 for r in results if r and "error" in r)
+        }
+    
+    def _save(self, audio: FLAC) -> bool:
+        """Speichere Tags - in-place, solange das vorhandene Padding reicht
+
+        Gibt zurück, ob die Tags in-place geschrieben wurden (sonst wurde die
+        ganze Datei neu geschrieben, was auf SD-Karten der teuerste Schritt ist).
+        """
+        result = {}
+        
+        def choose_padding(info):
+            # info.padding = verbleibendes Padding ohne Verschieben der Audiodaten
+            result["in_place"] = info.padding >= 0
+            return info.padding if info.padding >= 0 else self.padding
+        
+        audio.save(padding=choose_padding)
+        in_place = result.get("in_place", True)
+        with self._lock:
+            self.stats["in_place" if in_place else "rewrite"] += 1
+        if not in_place:
+            print(f"⚠️  Tags passten nicht ins Padding - {Path(audio.filename).name} komplett neu geschrieben")
+        return in_place
+    
+    def _set_front_cover(self, audio: FLAC, cover_path: Path) -> bool:
+        """Setze das Front-Cover - False, wenn genau dieses Cover schon vorhanden ist"""
+        picture = self._prepare_cover(cover_path)
+        front_covers = [p for p in audio.pictures if p.type == 3]
+        if len(front_covers) == 1 and front_covers[0].data == picture.data:
+            return False
+        # Vorhandene Front-Cover entfernen, andere Bilder (Rückseite etc.) behalten
+        audio.metadata_blocks = [
+            block for block in audio.metadata_blocks
+            if not (isinstance(block, Picture) and block.type == 3)
+        ]
+        audio.add_picture(picture)
+        return True
+    
+    def _prepare_cover(self, cover_path: Path) -> Picture:
+        """Picture-Block für ein Cover - pro Bildinhalt nur einmal dekodiert und kodiert"""
+        data = Path(cover_path).read_bytes()
+        key = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            picture = self._cover_cache.get(key)
+            if picture is not None:
+                self._cover_cache.move_to_end(key)
+                return picture
+        
+        picture = self._encode_cover(data)
+        with self._lock:
+            self._cover_cache[key] = picture
+            self._cover_cache.move_to_end(key)
+            # Älteste Cover verwerfen (LRU)
+            while len(self._cover_cache) > self.cover_cache_size:
+                self._cover_cache.popitem(last=False)
+        return picture
+    
+    def _encode_cover(self, data: bytes) -> Picture:
+        """Skaliere und kodiere ein Cover als JPEG-Picture-Block"""
         try:
             # Lade Bild
-            image = Image.open(cover_path)
+            image = Image.open(io.BytesIO(data))
             
             # Konvertiere zu RGB falls nötig
             if image.mode != 'RGB':
@@ -65,9 +194,8 @@ class AudioTagger:
             picture.data = img_bytes.read()
             picture.width = image.width
             picture.height = image.height
-            
-            # Füge zu FLAC hinzu
-            audio.add_picture(picture)
+            picture.depth = 24
+            return picture
             
         except Exception as e:
             print(f"Fehler beim Verarbeiten des Covers: {e}")
@@ -0,0 +1,27 @@
+import numpy as np
+
+from audio_stream import CaptureSink
+
+
+def test_level_is_mean_absolute(tmp_path):
+    sink = CaptureSink(tmp_path / "test.flac", 44100, 2)
+    # Rechteck mit Amplitude 0.5 auf einem Kanal, Stille auf dem anderen: Mittelwert 0.25 (RMS wäre 0.354)
+    block = np.zeros((4410, 2), dtype=np.int16)
+    block[:, 0] = np.where(np.arange(4410) % 2, 16384, -16384)
+    sink.process(block)
+    assert abs(sink.current_level - 0.25) < 1e-6
+    sink.process(np.full((4410, 2), -32768, dtype=np.int16))
+    assert abs(sink.current_level - 1.0) < 1e-6
+    sink.close()
+
+
+def test_auto_stop_after_silence(tmp_path):
+    stopped = []
+    sink = CaptureSink(tmp_path / "test.flac", 1000, 1, auto_stop_silence_seconds=2.0,
+                       on_silence=lambda: stopped.append(True))
+    sink.process(np.full((1000, 1), 8000, dtype=np.int16))
+    sink.process(np.zeros((1500, 1), dtype=np.int16))
+    assert stopped == []
+    sink.process(np.zeros((1000, 1), dtype=np.int16))
+    assert stopped == [True]
+    sink.close()
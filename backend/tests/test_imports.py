@@ -0,0 +1,67 @@
+import importlib.util
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Budget für "import main" (Sekunden) - auf dem Pi per Umgebungsvariable anpassbar
+IMPORT_BUDGET_SECONDS = float(os.environ.get("VINYL_IMPORT_BUDGET", "3.0"))
+
+# Ersatz für PyAudio ohne Audio-Hardware: der Server fällt dann auf den ALSA-Recorder zurück
+PYAUDIO_STUB = '''
+paInt16 = 8
+paContinue = 0
+
+class PyAudio:
+    def __init__(self):
+        raise OSError("Keine Audio-Hardware (Test)")
+'''
+
+
+def test_splitter_import_does_not_load_librosa():
+    # Eigener Interpreter, damit andere Tests sys.modules nicht beeinflussen
+    code = (
+        "import sys, track_splitter, audio_stream, metadata_search, track_alignment, release_index; "
+        "heavy = [name for name in ('librosa', 'numba', 'sklearn') if name in sys.modules]; "
+        "assert not heavy, heavy"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+@pytest.mark.skipif(importlib.util.find_spec("fastapi") is None, reason="fastapi nicht installiert")
+def test_import_main_within_budget(tmp_path):
+    # Kopie des Backends, damit recordings/ und config/ im Testverzeichnis entstehen
+    backend = tmp_path / "backend"
+    backend.mkdir()
+    for module in BACKEND_DIR.glob("*.py"):
+        shutil.copy(module, backend)
+    stubs = tmp_path / "stubs"
+    stubs.mkdir()
+    (stubs / "pyaudio.py").write_text(PYAUDIO_STUB, encoding="utf-8")
+
+    code = (
+        "import sys, time; "
+        "start = time.perf_counter(); "
+        "import main; "
+        "elapsed = time.perf_counter() - start; "
+        "heavy = [name for name in ('librosa', 'numba', 'sklearn') if name in sys.modules]; "
+        "print(f'IMPORT {elapsed:.3f} {\",\".join(heavy)}')"
+    )
+    env = dict(os.environ, PYTHONPATH=str(stubs))
+    result = subprocess.run([sys.executable, "-c", code], cwd=backend, env=env,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    line = next(line for line in result.stdout.splitlines() if line.startswith("IMPORT "))
+    parts = line.split(" ")
+    elapsed = float(parts[1])
+    heavy = parts[2] if len(parts) > 2 else ""
+    assert not heavy, f"Schwere Abhängigkeiten beim Start geladen: {heavy}"
+    assert elapsed <= IMPORT_BUDGET_SECONDS, (
+        f"import main dauerte {elapsed:.2f}s (Budget {IMPORT_BUDGET_SECONDS:.1f}s)"
+    )
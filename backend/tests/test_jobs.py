@@ -0,0 +1,44 @@
+import asyncio
+import json
+
+from jobs import JobManager
+
+
+def test_concurrent_saves_keep_state_file_consistent(tmp_path, capsys):
+    state_file = tmp_path / "jobs.json"
+    jobs = JobManager(state_file, max_workers=8, max_history=50)
+    jobs.register("noop", lambda job, n: n)
+
+    for i in range(300):
+        jobs.submit("noop", n=i)
+    jobs._executor.shutdown(wait=True)
+
+    assert "Fehler beim Speichern der Jobs" not in capsys.readouterr().out
+    saved = json.loads(state_file.read_text(encoding="utf-8"))
+    assert all(entry["state"] == "done" for entry in saved)
+    assert len(saved) == 50
+
+
+def test_wait_returns_none_for_pruned_job(tmp_path):
+    jobs = JobManager(tmp_path / "jobs.json", max_workers=1, max_history=0)
+    jobs.register("noop", lambda job: None)
+    job = jobs.submit("noop")
+    # Mit max_history=0 wird der fertige Job beim Speichern sofort verworfen
+    assert asyncio.run(jobs.wait(job.id)) is None
+    assert jobs.get(job.id) is None
+
+
+def test_resume_drops_parameters_the_handler_no_longer_takes(tmp_path):
+    state_file = tmp_path / "jobs.json"
+    # Job aus einer älteren Version, z.B. auto_tag mit tracks_per_side
+    state_file.write_text(json.dumps([{
+        "id": "old", "kind": "auto_tag", "state": "running", "progress": 40.0,
+        "params": {"base_filename": "side.flac", "release_mbid": "abc", "tracks_per_side": 5}
+    }]), encoding="utf-8")
+    jobs = JobManager(state_file, max_workers=1)
+    jobs.register("auto_tag", lambda job, base_filename, release_mbid: (base_filename, release_mbid))
+    jobs.resume()
+    job = asyncio.run(jobs.wait("old"))
+    assert job.state == "done"
+    assert job.result == ("side.flac", "abc")
+    assert job.params == {"base_filename": "side.flac", "release_mbid": "abc"}
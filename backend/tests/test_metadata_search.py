@@ -0,0 +1,75 @@
+import time
+
+from metadata_search import MetadataSearcher, ResponseCache
+
+
+def release(mbid, lengths_ms):
+    return {
+        "mbid": mbid,
+        "media": [{
+            "position": 1,
+            "tracks": [{"position": i + 1, "length": length} for i, length in enumerate(lengths_ms)]
+        }]
+    }
+
+
+def test_rank_releases_orders_by_alignment():
+    searcher = MetadataSearcher()
+    releases = [
+        release("wrong", [100000] * 6),
+        release("right", [200000, 150000, 300000, 240000]),
+        release("unknown", [0, 0, 0, 0]),
+    ]
+    ranking = searcher.rank_releases(releases, [201, 149, 301, 241])
+    assert [entry["mbid"] for entry in ranking] == ["right", "wrong", "unknown"]
+    assert ranking[0]["score"] > 90
+    assert ranking[2]["score"] is None
+
+
+def test_rank_releases_without_durations_is_unscored():
+    searcher = MetadataSearcher()
+    ranking = searcher.rank_releases([release("a", [200000])], [])
+    assert ranking == [{"mbid": "a", "score": None, "confidence": None}]
+
+
+def test_cache_hit_does_not_write(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite")
+    cache.put("k", 200, b"{}", "application/json", ttl=60)
+    changes = cache._conn.total_changes
+    for _ in range(10):
+        assert cache.get("k")[:2] == (200, b"{}")
+    assert cache._conn.total_changes == changes
+
+
+def test_cache_lru_uses_batched_access_times(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite", max_image_bytes=150)
+    cache.ACCESS_RESOLUTION = 0
+    cache.put("a", 200, b"x" * 60, "image/jpeg", ttl=60)
+    time.sleep(0.01)
+    cache.put("b", 200, b"x" * 60, "image/jpeg", ttl=60)
+    time.sleep(0.01)
+    # Zugriff auf "a" wird erst beim nächsten put() geschrieben, zählt aber für die Verdrängung
+    assert cache.get("a") is not None
+    time.sleep(0.01)
+    cache.put("c", 200, b"x" * 60, "image/jpeg", ttl=60)
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_stale_entry_is_served_and_revalidated(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path / "cache.sqlite", stale_seconds=3600)
+    searcher = MetadataSearcher(cache=cache)
+    revalidated = []
+    monkeypatch.setattr(searcher, "_revalidate", lambda url, params, key: revalidated.append(key))
+    url = f"{searcher.musicbrainz_base}/release/x"
+    key = ResponseCache.make_key(url, None)
+
+    cache.put(key, 200, b"{\"id\": \"x\"}", "application/json", ttl=-10)
+    response = searcher._cached_response(url, None, key)
+    assert response.json() == {"id": "x"}
+    assert revalidated == [key]
+
+    # Länger als stale_seconds abgelaufen: nicht mehr ausliefern
+    cache.put(key, 200, b"{}", "application/json", ttl=-7200)
+    assert searcher._cached_response(url, None, key) is None
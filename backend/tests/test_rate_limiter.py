@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from metadata_search import MetadataSearcher, RateLimiter
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Lokaler Ersatz für MusicBrainz / Cover Art Archive: merkt sich die Ankunftszeiten"""
+
+    def do_GET(self):
+        self.server.arrivals.append((self.path, time.monotonic()))
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    httpd.arrivals = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_searcher(server, rate):
+    port = server.server_address[1]
+    # Unterschiedliche Hostnamen: nur MusicBrainz (127.0.0.1) ist limitiert
+    searcher = MetadataSearcher(musicbrainz_base=f"http://127.0.0.1:{port}/ws/2",
+                                coverart_base=f"http://localhost:{port}")
+    searcher.limiter = RateLimiter(rate=rate, burst=1)
+    return searcher
+
+
+def spacings(times):
+    times = sorted(times)
+    return [b - a for a, b in zip(times, times[1:])]
+
+
+def test_concurrent_musicbrainz_requests_are_spaced(server):
+    searcher = make_searcher(server, rate=20)
+
+    async def run():
+        await asyncio.gather(*[
+            searcher._get_async(f"{searcher.musicbrainz_base}/release/{i}") for i in range(6)
+        ])
+
+    asyncio.run(run())
+    times = [t for path, t in server.arrivals if path.startswith("/ws/2/")]
+    assert len(times) == 6
+    assert min(spacings(times)) >= 0.045
+
+
+def test_coverart_requests_are_not_limited(server):
+    searcher = make_searcher(server, rate=1)
+
+    async def run():
+        await asyncio.gather(*[
+            searcher._get_async(f"{searcher.coverart_base}/release/{i}") for i in range(5)
+        ])
+
+    start = time.monotonic()
+    asyncio.run(run())
+    assert len(server.arrivals) == 5
+    assert time.monotonic() - start < 0.9
+
+
+def test_threads_share_the_limiter():
+    limiter = RateLimiter(rate=20, burst=1)
+    times = []
+
+    def worker():
+        limiter.wait()
+        times.append(time.monotonic())
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert min(spacings(times)) >= 0.045
+
+
+def test_cancelled_waiters_do_not_consume_tokens():
+    limiter = RateLimiter(rate=5, burst=1)
+
+    async def run():
+        # Erster Aufrufer nimmt das Token, die übrigen warten und werden abgebrochen
+        waiters = [asyncio.create_task(limiter.wait_async()) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        for task in waiters:
+            task.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        start = time.monotonic()
+        await limiter.wait_async()
+        return time.monotonic() - start
+
+    # Nur ein Intervall (0.2s) bis zum nächsten Token, nicht fünf
+    assert asyncio.run(run()) < 0.4
@@ -0,0 +1,125 @@
+import asyncio
+import gzip
+import io
+import json
+import tarfile
+
+import pytest
+
+from metadata_search import MetadataSearcher
+from release_index import ReleaseIndex
+
+
+def release(mbid, title, artist, lengths, date="1973-03-01", joinphrase="", featured=None):
+    credit = [{"name": artist, "joinphrase": joinphrase, "artist": {"name": artist}}]
+    if featured:
+        credit.append({"name": featured, "joinphrase": "", "artist": {"name": featured}})
+    return {
+        "id": mbid,
+        "title": title,
+        "date": date,
+        "country": "GB",
+        "artist-credit": credit,
+        "media": [{
+            "position": 1,
+            "format": "12\" Vinyl",
+            "track-count": len(lengths),
+            "tracks": [
+                {"position": i + 1, "length": length, "recording": {"title": f"{title} {i + 1}", "length": length}}
+                for i, length in enumerate(lengths)
+            ]
+        }]
+    }
+
+
+RELEASES = [
+    release("dsotm", "The Dark Side of the Moon", "Pink Floyd", [68000, 169000, 216000]),
+    release("wish", "Wish You Were Here", "Pink Floyd", [811000, 454000]),
+    release("motorhead", "Motörhead", "Motörhead", [0, 180000], date="1977"),
+    release("collab", "Under Pressure", "Queen", [248000], joinphrase=" & ", featured="David Bowie"),
+]
+
+
+@pytest.fixture
+def dump(tmp_path):
+    path = tmp_path / "releases.jsonl.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write("\n")
+        for entry in RELEASES:
+            f.write(json.dumps(entry) + "\n")
+        f.write(json.dumps({"id": "broken"}) + "\n")  # ohne Titel: wird übersprungen
+    return path
+
+
+@pytest.fixture
+def index(tmp_path, dump):
+    index = ReleaseIndex(tmp_path / "index.sqlite")
+    progress = []
+    assert index.import_dump(dump, batch_size=2, progress_callback=progress.append) == 4
+    assert progress[-1] == 4
+    return index
+
+
+def test_import_dump_counts_releases(index):
+    assert index.count() == 4
+
+
+def test_reimport_replaces_releases(index, dump):
+    assert index.import_dump(dump) == 4
+    assert index.count() == 4
+    assert len(index.search("Pink Floyd", "Dark Side")) == 1
+
+
+def test_search_matches_artist_and_title(index):
+    results = index.search("pink floyd", "wish")
+    assert [r["mbid"] for r in results] == ["wish"]
+    assert results[0]["artist"] == "Pink Floyd"
+    assert results[0]["track_count"] == 2
+    assert results[0]["source"] == "local"
+    assert index.search("Pink Floyd", "Animals") == []
+    assert index.search("", "") == []
+
+
+def test_search_ignores_diacritics_and_quotes(index):
+    assert [r["mbid"] for r in index.search("Motorhead", "motorhead")] == ["motorhead"]
+    # Anführungszeichen werden escaped statt die FTS-Query zu brechen
+    assert [r["mbid"] for r in index.search('Pink "Floyd', "Moon")] == ["dsotm"]
+
+
+def test_search_uses_full_artist_credit(index):
+    assert [r["mbid"] for r in index.search("Bowie", "Pressure")] == ["collab"]
+
+
+def test_get_release_has_api_shape(index):
+    data = index.get_release("dsotm")
+    assert data["title"] == "The Dark Side of the Moon"
+    assert data["artist-credit"][0]["name"] == "Pink Floyd"
+    tracks = data["media"][0]["tracks"]
+    assert [t["length"] for t in tracks] == [68000, 169000, 216000]
+    assert tracks[0]["recording"]["title"] == "The Dark Side of the Moon 1"
+    assert MetadataSearcher.release_track_lengths({"media": data["media"]}) == [68.0, 169.0, 216.0]
+    assert index.get_release("missing") is None
+
+
+def test_import_json_array_and_tar(tmp_path):
+    array_path = tmp_path / "subset.json"
+    array_path.write_text(json.dumps(RELEASES[:2]), encoding="utf-8")
+
+    tar_path = tmp_path / "release.tar.xz"
+    payload = "".join(json.dumps(entry) + "\n" for entry in RELEASES[2:]).encode("utf-8")
+    with tarfile.open(tar_path, "w:xz") as archive:
+        member = tarfile.TarInfo("mbdump/release")
+        member.size = len(payload)
+        archive.addfile(member, io.BytesIO(payload))
+
+    index = ReleaseIndex(tmp_path / "index.sqlite")
+    assert index.import_dump(array_path) == 2
+    assert index.import_dump(tar_path) == 2
+    assert index.count() == 4
+
+
+def test_searcher_prefers_local_index(index):
+    searcher = MetadataSearcher(musicbrainz_base="http://127.0.0.1:9/ws/2", index=index)
+    results = asyncio.run(searcher.search_releases("Pink Floyd", "Dark Side"))
+    assert [r["mbid"] for r in results] == ["dsotm"]
+    assert searcher.get_release("wish")["title"] == "Wish You Were Here"
@@ -0,0 +1,157 @@
+import numpy as np
+import pytest
+import soundfile as sf
+from mutagen.flac import FLAC, Picture
+from PIL import Image
+
+from audio_stream import CaptureSink
+from tagger import AudioTagger
+from track_splitter import TrackSplitter
+
+SR = 8000
+
+
+def tone(seconds: float, amplitude: float = 0.5) -> np.ndarray:
+    t = np.arange(int(seconds * SR)) / SR
+    return (amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+
+def padding_of(path) -> int:
+    """Größe des PADDING-Blocks einer FLAC-Datei (0 = keiner)"""
+    with open(path, "rb") as f:
+        assert f.read(4) == b"fLaC"
+        while True:
+            header = f.read(4)
+            length = int.from_bytes(header[1:], "big")
+            if header[0] & 0x7F == 1:
+                return length
+            f.seek(length, 1)
+            if header[0] & 0x80:
+                return 0
+
+
+@pytest.fixture
+def cover(tmp_path):
+    # Rauschen komprimiert schlecht: Cover im Bereich einiger hundert KB
+    pixels = np.random.default_rng(0).integers(0, 256, (500, 500, 3), dtype=np.uint8)
+    path = tmp_path / "cover.png"
+    Image.fromarray(pixels).save(path)
+    return path
+
+
+@pytest.fixture
+def split_track(tmp_path):
+    source = tmp_path / "side.flac"
+    sf.write(source, np.concatenate([tone(15), np.zeros(3 * SR, dtype=np.float32), tone(15)]), SR,
+             subtype="PCM_16")
+    out = tmp_path / "tracks"
+    out.mkdir()
+    tracks = TrackSplitter().split_audio(source, out)
+    assert len(tracks) == 2
+    return out / tracks[0]["filename"]
+
+
+def test_split_tracks_are_written_with_padding(split_track, tmp_path):
+    assert padding_of(split_track) == 512 * 1024
+    # Audio-Daten bleiben unverändert
+    source, _ = sf.read(tmp_path / "side.flac", dtype="int16")
+    track, _ = sf.read(split_track, dtype="int16")
+    assert np.array_equal(track, source[:len(track)])
+
+
+def test_master_has_no_padding(tmp_path):
+    sink = CaptureSink(tmp_path / "master.flac", SR, 1)
+    sink.process((tone(2)[:, None] * 32767).astype(np.int16))
+    sink.close()
+    assert padding_of(tmp_path / "master.flac") == 0
+
+
+def test_tagging_padded_track_with_cover_is_in_place(split_track, cover):
+    tagger = AudioTagger()
+    size = split_track.stat().st_size
+    result = tagger.tag_file(split_track, title="Time", artist="Pink Floyd", cover_path=cover)
+    assert result["written"] and result["in_place"]
+    assert "COVER" in result["changed"]
+    assert split_track.stat().st_size == size
+    assert tagger.stats == {"in_place": 1, "rewrite": 0, "unchanged": 0}
+    assert len(FLAC(str(split_track)).pictures) == 1
+
+
+def test_tagging_unpadded_file_reports_rewrite(tmp_path, cover):
+    path = tmp_path / "plain.flac"
+    sf.write(path, tone(5), SR, subtype="PCM_16")
+    assert padding_of(path) == 0
+    tagger = AudioTagger()
+    result = tagger.tag_file(path, title="Money", cover_path=cover)
+    assert result["written"] and not result["in_place"]
+    assert tagger.stats["rewrite"] == 1
+    # Beim Neuschreiben wird Padding reserviert - der nächste Write passt in-place
+    assert padding_of(path) >= 512 * 1024
+    assert tagger.tag_file(path, title="Us and Them")["in_place"]
+
+
+def other_cover(tmp_path, name="other.png", color=(200, 30, 30)):
+    path = tmp_path / name
+    Image.new("RGB", (300, 300), color).save(path)
+    return path
+
+
+def test_retagging_is_a_no_op(split_track, cover):
+    tagger = AudioTagger()
+    tags = dict(title="Breathe", artist="Pink Floyd", album="The Dark Side of the Moon",
+                track_number=2, total_tracks=10, year="1973", cover_path=cover)
+    first = tagger.tag_file(split_track, **tags)
+    assert first["written"]
+    content = split_track.read_bytes()
+    mtime = split_track.stat().st_mtime_ns
+
+    second = tagger.tag_file(split_track, **tags)
+    assert second == {"changed": [], "written": False, "in_place": True}
+    assert split_track.read_bytes() == content
+    assert split_track.stat().st_mtime_ns == mtime
+    assert tagger.stats["unchanged"] == 1
+
+
+def test_changed_field_is_reported(split_track):
+    tagger = AudioTagger()
+    tagger.tag_file(split_track, title="Breathe", artist="Pink Floyd")
+    result = tagger.tag_file(split_track, title="Breathe (In the Air)", artist="Pink Floyd")
+    assert result["changed"] == ["TITLE"]
+    assert FLAC(str(split_track))["TITLE"] == ["Breathe (In the Air)"]
+
+
+def test_new_cover_replaces_front_cover_and_keeps_other_pictures(split_track, cover, tmp_path):
+    tagger = AudioTagger()
+    tagger.tag_file(split_track, cover_path=cover)
+
+    # Rückseite (Typ 4) zusätzlich einbetten
+    audio = FLAC(str(split_track))
+    back = Picture()
+    back.type = 4
+    back.mime = "image/png"
+    back.data = other_cover(tmp_path, "back.png", (10, 10, 10)).read_bytes()
+    audio.add_picture(back)
+    audio.save()
+
+    result = tagger.tag_file(split_track, cover_path=other_cover(tmp_path))
+    assert result["changed"] == ["COVER"]
+    pictures = FLAC(str(split_track)).pictures
+    fronts = [p for p in pictures if p.type == 3]
+    assert len(fronts) == 1
+    assert fronts[0].data == tagger._prepare_cover(other_cover(tmp_path)).data
+    assert [p.data for p in pictures if p.type == 4] == [back.data]
+    assert len(pictures) == 2
+
+    # Gleiches Cover nochmal: nichts zu schreiben
+    assert tagger.tag_file(split_track, cover_path=other_cover(tmp_path))["written"] is False
+
+
+def test_tag_files_reports_per_file_status(tmp_path, split_track, cover):
+    tagger = AudioTagger(max_workers=2)
+    second = split_track.with_name(split_track.name.replace("_01", "_02"))
+    items = [(split_track, {"title": "A", "cover_path": cover}), (second, {"title": "B", "cover_path": cover})]
+    first = tagger.tag_files(items)
+    assert (first["tagged"], first["unchanged"], first["in_place_writes"], first["rewrites"]) == (2, 0, 2, 0)
+    again = tagger.tag_files(items)
+    assert (again["tagged"], again["unchanged"]) == (2, 2)
+    assert [f["written"] for f in again["files"]] == [False, False]
@@ -0,0 +1,56 @@
+import pytest
+
+from track_alignment import align_tracks
+
+REFERENCE = [200, 150, 300, 240, 180, 210, 190, 260]
+
+
+def mapping_of(result):
+    return [(entry["reference"], entry["kind"]) for entry in result["mapping"]]
+
+
+def test_exact_match_maps_one_to_one():
+    [result] = align_tracks([201, 149, 301, 241, 181, 209, 191, 259], [REFERENCE])
+    assert mapping_of(result) == [([j], "match") for j in range(8)]
+    assert result["confidence"] > 0.95
+
+
+def test_missed_split_is_a_merge():
+    [result] = align_tracks([201, 450, 241, 181, 209, 191, 259], [REFERENCE])
+    assert mapping_of(result)[1] == ([1, 2], "merge")
+    # Die Titel danach sind nicht verschoben
+    assert mapping_of(result)[2:] == [([j], "match") for j in range(3, 8)]
+
+
+def test_extra_split_is_a_split():
+    [result] = align_tracks([201, 149, 301, 120, 120, 181, 209, 191, 259], [REFERENCE])
+    assert mapping_of(result)[3:5] == [([3], "split"), ([3], "split")]
+    assert [entry.get("part") for entry in result["mapping"][3:5]] == [1, 2]
+    assert mapping_of(result)[5:] == [([j], "match") for j in range(4, 8)]
+
+
+def test_extra_track_is_skipped():
+    [result] = align_tracks([201, 149, 30, 301, 241], [REFERENCE[:4]])
+    assert mapping_of(result) == [([0], "match"), ([1], "match"), ([], "extra"), ([2], "match"), ([3], "match")]
+    assert result["mapping"][2]["confidence"] == 0.0
+
+
+def test_single_side_aligns_to_a_subrange():
+    [result] = align_tracks([181, 209, 191, 259], [REFERENCE])
+    assert mapping_of(result) == [([j], "match") for j in range(4, 8)]
+
+
+def test_unknown_lengths_fall_back_to_order():
+    [result] = align_tracks([201, 149, 301], [[None, None, None, None]])
+    assert mapping_of(result) == [([0], "match"), ([1], "match"), ([2], "match")]
+
+
+def test_batch_ranks_candidates_and_matches_single_runs():
+    detected = [201, 149, 301, 241]
+    candidates = [[100] * 5, REFERENCE[:4], REFERENCE, [200, None, 300, 240], []]
+    batch = align_tracks(detected, candidates)
+    assert min(range(len(batch)), key=lambda i: batch[i]["cost"]) == 1
+    for candidate, result in zip(candidates, batch):
+        [single] = align_tracks(detected, [candidate])
+        assert single["cost"] == pytest.approx(result["cost"])
+        assert mapping_of(single) == mapping_of(result)
@@ -0,0 +1,250 @@
+import time
+
+import numpy as np
+import soundfile as sf
+import pytest
+
+from track_splitter import TrackSplitter, RmsEnvelope, SilenceDetector
+
+SR = 8000
+
+
+def tone(seconds: float, rms: float, freq: float = 440.0) -> np.ndarray:
+    t = np.arange(int(seconds * SR)) / SR
+    return (rms * np.sqrt(2) * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def noise(seconds: float, rms: float, seed: int = 0) -> np.ndarray:
+    return (np.random.default_rng(seed).standard_normal(int(seconds * SR)) * rms).astype(np.float32)
+
+
+@pytest.fixture
+def quiet_then_loud(tmp_path):
+    """Leiser Track, Pause mit Rauschen, lauter Track, Pause, mittlerer Track"""
+    audio = np.concatenate([
+        tone(60, 0.05),
+        noise(3, 0.002, seed=1),
+        tone(60, 0.9),
+        noise(3, 0.002, seed=2),
+        tone(30, 0.5),
+    ])
+    path = tmp_path / "side.flac"
+    sf.write(path, audio, SR, subtype="PCM_16")
+    return path
+
+
+def test_quiet_opening_track_is_split_against_global_peak(quiet_then_loud):
+    # Die erste Pause liegt -28 dB unter dem leisen Track, aber -53 dB unter dem
+    # Maximum der Aufnahme - relativ zum Maximum ist sie Stille
+    splitter = TrackSplitter()
+    envelope = splitter.compute_envelope(quiet_then_loud)
+    points = splitter.find_split_points(envelope["rms"], envelope["sr"], envelope["frames"])
+    assert len(points) == 4
+    assert points[0] == 0.0
+    assert points[1] == pytest.approx(61.5, abs=0.1)
+    assert points[2] == pytest.approx(124.5, abs=0.1)
+    assert points[3] == pytest.approx(156.0, abs=0.01)
+
+
+def test_live_analyzer_final_points_match_offline(quiet_then_loud):
+    splitter = TrackSplitter()
+    data, sr = sf.read(quiet_then_loud, dtype="int16", always_2d=True)
+    analyzer = splitter.live_analyzer(sr, data.shape[1])
+    for start in range(0, len(data), 4096):
+        analyzer.feed(data[start:start + 4096])
+    analyzer.finish(quiet_then_loud, len(data))
+
+    envelope = splitter.compute_envelope(quiet_then_loud)
+    offline = splitter.find_split_points(envelope["rms"], envelope["sr"], envelope["frames"])
+    assert analyzer.split_points == offline[1:-1]
+
+
+def test_split_audio_uses_global_peak_and_keeps_samples(quiet_then_loud, tmp_path):
+    splitter = TrackSplitter()
+    splitter.workers = 2
+    out = tmp_path / "tracks"
+    out.mkdir()
+    tracks = splitter.split_audio(quiet_then_loud, out)
+    assert len(tracks) == 3
+
+    source, _ = sf.read(quiet_then_loud, dtype="int16")
+    joined = np.concatenate([sf.read(out / t["filename"], dtype="int16")[0] for t in tracks])
+    assert np.array_equal(joined, source)
+
+
+def test_envelope_is_independent_of_block_size():
+    audio = noise(5, 0.3)
+    whole = RmsEnvelope()
+    expected = np.concatenate([whole.feed(audio), whole.finish()])
+    for block in (1, 511, 512, 4096, 10000):
+        envelope = RmsEnvelope()
+        parts = [envelope.feed(audio[i:i + block]) for i in range(0, len(audio), block)]
+        parts.append(envelope.finish())
+        assert np.array_equal(np.concatenate(parts), expected)
+
+
+def test_concurrent_splits_share_one_bounded_pool(quiet_then_loud, tmp_path, capsys):
+    from concurrent.futures import ThreadPoolExecutor
+
+    splitter = TrackSplitter()
+    splitter.workers = 2
+    outputs = []
+    for name in ("a", "b", "c"):
+        out = tmp_path / name
+        out.mkdir()
+        outputs.append(out)
+    with ThreadPoolExecutor(3) as callers:
+        results = list(callers.map(lambda out: splitter.split_audio(quiet_then_loud, out), outputs))
+
+    assert [len(tracks) for tracks in results] == [3, 3, 3]
+    assert splitter._pool is not None and splitter._pool._max_workers == 2
+    # Alle drei speichern die Hüllkurve derselben Aufnahme gleichzeitig
+    assert "Fehler beim Speichern der Hüllkurve" not in capsys.readouterr().out
+    assert [p.name for p in (quiet_then_loud.parent / ".analysis").iterdir()] == ["side.envelope.npz"]
+
+
+def test_envelope_sidecar_roundtrip_is_exact(quiet_then_loud):
+    splitter = TrackSplitter()
+    computed = splitter.compute_envelope(quiet_then_loud)
+    loaded = splitter.load_envelope(quiet_then_loud)
+    assert loaded["rms"].dtype == np.float32
+    assert np.array_equal(loaded["rms"], computed["rms"])
+
+
+def test_remove_analysis_deletes_sidecars(quiet_then_loud):
+    splitter = TrackSplitter()
+    splitter.compute_envelope(quiet_then_loud)
+    splitter.load_waveform(quiet_then_loud)
+    sidecars = list((quiet_then_loud.parent / ".analysis").iterdir())
+    assert {p.suffix for p in sidecars} == {".npz", ".json"}
+    splitter.remove_analysis(quiet_then_loud)
+    assert list((quiet_then_loud.parent / ".analysis").iterdir()) == []
+    splitter.remove_analysis(quiet_then_loud)
+
+
+def reference_split_points(rms, hop, threshold, min_silence, min_track, sr=SR):
+    """Frühere Frame-Schleife über alle stillen Indizes als Referenz für die vektorisierte Erkennung"""
+    db = 20 * np.log10(np.maximum(1e-5, rms)) - 20 * np.log10(max(1e-5, rms.max()))
+    points, regions = [0.0], 0
+
+    def close_region(start, end):
+        start_time, end_time = start * hop / sr, end * hop / sr
+        split_point = (start_time + end_time) / 2
+        if end_time - start_time >= min_silence and split_point - points[-1] >= min_track:
+            points.append(split_point)
+
+    start = end = None
+    for index in np.where(db < threshold)[0]:
+        # Lücke > 1 Frame: neuer Bereich
+        if start is not None and index - end > 1:
+            close_region(start, end)
+            regions += 1
+            start = None
+        if start is None:
+            start = index
+        end = index
+    if start is not None:
+        close_region(start, end)
+        regions += 1
+    return points, regions
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_vectorized_regions_match_frame_loop(seed):
+    rng = np.random.default_rng(seed)
+    # Laute Abschnitte und Pausen zufälliger Länge, auch direkt am Anfang und Ende
+    runs = [rng.uniform(0.2, 1.0, rng.integers(1, 200)) if i % 2 else rng.uniform(0, 0.002, rng.integers(1, 60))
+            for i in range(int(rng.integers(20, 40)))]
+    rms = np.concatenate(runs).astype(np.float32)
+    expected = reference_split_points(rms, 512, -40, 0.5, 2.0)
+
+    detector = SilenceDetector(SR, 512, -40, 0.5, 2.0, verbose=False, reference_peak=float(rms.max()))
+    position = 0
+    while position < len(rms):
+        size = int(rng.integers(1, 100))
+        detector.feed(rms[position:position + size])
+        position += size
+    detector.finish()
+    assert (detector.split_points, detector.region_count) == (pytest.approx(expected[0]), expected[1])
+
+
+def test_envelope_matches_centered_frames():
+    audio = noise(2, 0.3, seed=3)[:12345]
+    envelope = RmsEnvelope(frame_length=2048, hop_length=512)
+    rms = np.concatenate([envelope.feed(audio), envelope.finish()])
+    padded = np.pad(audio.astype(np.float64), 1024)
+    expected = [np.sqrt(np.mean(padded[k * 512:k * 512 + 2048] ** 2)) for k in range(1 + len(audio) // 512)]
+    assert len(rms) == 1 + len(audio) // 512
+    assert np.allclose(rms, expected, rtol=1e-6)
+
+
+def test_split_points_are_in_seconds_for_any_sample_rate(tmp_path):
+    points = {}
+    for sr in (8000, 44100):
+        t = np.arange(int(20 * sr)) / sr
+        audio = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+        audio[int(9 * sr):int(12 * sr)] = 0.0
+        path = tmp_path / f"{sr}.flac"
+        sf.write(path, audio, sr, subtype="PCM_16")
+        splitter = TrackSplitter()
+        splitter.min_track_duration = 5.0
+        envelope = splitter.compute_envelope(path)
+        points[sr] = splitter.find_split_points(envelope["rms"], envelope["sr"], envelope["frames"])
+    assert len(points[8000]) == 3
+    assert points[8000] == pytest.approx(points[44100], abs=0.1)
+    assert points[8000][1] == pytest.approx(10.5, abs=0.1)
+
+
+def box_set_envelope(hours=3.0, sr=44100, hop=512, seed=0):
+    """Hüllkurve einer mehrstündigen Aufnahme: Tracks mit Pausen, dazwischen Rauschen um die Schwelle"""
+    rng = np.random.default_rng(seed)
+    total = int(hours * 3600 * sr / hop)
+    frames_per_second = sr / hop
+    # Rauschen flackert um -40 dB (Amplitude 0.01 bei Spitzenpegel 1.0)
+    rms = (0.01 * 10 ** rng.uniform(-0.4, 0.2, total)).astype(np.float32)
+    position = 0
+    while position < total:
+        track = int(rng.uniform(120, 420) * frames_per_second)
+        rms[position:position + track] = rng.uniform(0.1, 1.0, len(rms[position:position + track]))
+        position += track
+        # Echte Pause zwischen den Tracks, danach wieder flackerndes Rauschen
+        gap = int(rng.uniform(2, 5) * frames_per_second)
+        rms[position:position + gap] = rng.uniform(0, 0.001, len(rms[position:position + gap]))
+        position += gap + int(rng.uniform(60, 180) * frames_per_second)
+    return rms
+
+
+def test_silence_detection_benchmark_three_hours():
+    sr, hop = 44100, 512
+    rms = box_set_envelope(sr=sr, hop=hop)
+    assert len(rms) > 900_000
+
+    start = time.perf_counter()
+    expected = reference_split_points(rms, hop, -40, 2.0, 10.0, sr=sr)
+    loop_seconds = time.perf_counter() - start
+
+    # Offline-Pfad von split_audio: ganze Hüllkurve in einem Aufruf
+    splitter = TrackSplitter()
+    splitter.hop_length = hop
+    splitter.silence_threshold, splitter.min_silence_duration, splitter.min_track_duration = -40, 2.0, 10.0
+    frames = len(rms) * hop
+    start = time.perf_counter()
+    points = splitter.find_split_points(rms, sr, frames)
+    vectorized_seconds = time.perf_counter() - start
+
+    print(f"\n3h-Hüllkurve ({len(rms)} Frames, {expected[1]} Stille-Bereiche): "
+          f"Schleife {loop_seconds:.3f}s, vektorisiert {vectorized_seconds:.3f}s")
+    assert expected[1] > 50_000  # Rauschen flackert wirklich um die Schwelle
+    assert points == pytest.approx(expected[0] + [frames / sr])
+    # Großzügige Schranken, damit der Test auch auf langsamen Rechnern stabil bleibt
+    assert vectorized_seconds < 0.25
+    assert vectorized_seconds * 3 < loop_seconds
+
+    # Live-Analyse liefert dieselben Bereiche in 10-s-Blöcken
+    detector = SilenceDetector(sr, hop, -40, 2.0, 10.0, verbose=False, reference_peak=float(rms.max()))
+    block = int(10.0 * sr) // hop
+    for offset in range(0, len(rms), block):
+        detector.feed(rms[offset:offset + block])
+    detector.finish()
+    assert detector.region_count == expected[1]
+    assert detector.split_points == pytest.approx(expected[0])
@@ -0,0 +1,146 @@
+import numpy as np
+from typing import List, Dict, Optional, Sequence
+
+# Übergänge (a, b): a erkannte Tracks entsprechen b Release-Tracks
+# (1, 1) = Treffer, (1, b) = verpasster Split (Tracks verschmolzen), (a, 1) = Split zu viel
+SKIP_DETECTED = 0
+SKIP_REFERENCE = 1
+
+def _transitions(max_group: int):
+    pairs = [(1, 1)]
+    pairs += [(1, b) for b in range(2, max_group + 1)]
+    pairs += [(a, 1) for a in range(2, max_group + 1)]
+    return pairs
+
+def align_tracks(detected: Sequence[float], releases: Sequence[Sequence[Optional[float]]],
+                 max_group: int = 3, tolerance_seconds: float = 3.0, tolerance_ratio: float = 0.03,
+                 skip_cost: float = 2.5, edge_cost: float = 0.3, group_cost: float = 0.5,
+                 unknown_cost: float = 1.5, max_cost: float = 4.0) -> List[Dict]:
+    """Richte erkannte Track-Längen an den Track-Längen mehrerer Releases aus
+
+    Dynamische Programmierung über (erkannte Tracks × Release-Tracks), für alle
+    Kandidaten gleichzeitig: Releases sind die Batch-Achse, pro Zeile werden alle
+    Spalten vektorisiert berechnet (Überspringen von Release-Tracks per
+    kumulativem Minimum). Verschmolzene und zusätzlich gesplittete Tracks sowie
+    fehlende/zusätzliche Tracks werden toleriert; Release-Tracks am Anfang und
+    Ende dürfen günstig fehlen (z.B. nur eine LP-Seite aufgenommen).
+
+    detected: Längen der erkannten Tracks in Sekunden
+    releases: pro Release die Track-Längen in Sekunden (None/0 = unbekannt)
+
+    Gibt pro Release {"cost", "confidence", "mapping"} zurück; mapping enthält
+    pro erkanntem Track die zugeordneten Release-Track-Indizes, die Art der
+    Zuordnung ("match", "merge", "split", "extra") und eine Konfidenz 0..1.
+    """
+    d = np.asarray(detected, dtype=np.float64)
+    n = len(d)
+    batch = len(releases)
+    if batch == 0:
+        return []
+    lengths = [len(r) for r in releases]
+    m = max(lengths) if lengths else 0
+
+    # Release-Längen als (Batch, m)-Matrix, unbekannte Längen separat markiert
+    ref = np.zeros((batch, m))
+    unknown = np.zeros((batch, m))
+    valid = np.zeros((batch, m + 1), dtype=bool)
+    for b, release in enumerate(releases):
+        values = np.array([v if v else np.nan for v in release], dtype=np.float64)
+        ref[b, :len(values)] = np.nan_to_num(values)
+        unknown[b, :len(values)] = np.isnan(values)
+        valid[b, :len(values) + 1] = True
+    pd = np.concatenate([[0.0], np.cumsum(d)])
+    pr = np.concatenate([np.zeros((batch, 1)), np.cumsum(ref, axis=1)], axis=1)
+    pu = np.concatenate([np.zeros((batch, 1)), np.cumsum(unknown, axis=1)], axis=1)
+    columns = np.arange(m + 1)
+    transitions = _transitions(max_group)
+
+    cost = np.full((batch, n + 1, m + 1), np.inf)
+    choice = np.full((batch, n + 1, m + 1), -1, dtype=np.int8)
+    # Release-Tracks vor dem ersten erkannten Track fehlen (z.B. Seite A nicht aufgenommen)
+    cost[:, 0, :] = np.where(valid, edge_cost * columns, np.inf)
+
+    for i in range(1, n + 1):
+        # Erkannter Track ohne Gegenstück (Störgeräusch, Hidden Track)
+        row = cost[:, i - 1, :] + skip_cost
+        row_choice = np.full((batch, m + 1), SKIP_DETECTED, dtype=np.int8)
+
+        for index, (a, b) in enumerate(transitions, 2):
+            if a > i or b > m:
+                continue
+            detected_sum = pd[i] - pd[i - a]
+            reference_sum = pr[:, b:] - pr[:, :-b]
+            segment_unknown = (pu[:, b:] - pu[:, :-b]) > 0
+            error = np.abs(detected_sum - reference_sum) / (tolerance_seconds + tolerance_ratio * reference_sum)
+            segment = np.minimum(error ** 2, max_cost)
+            if a == 1 and b == 1:
+                segment = np.where(segment_unknown, unknown_cost, segment)
+            else:
+                segment = np.where(segment_unknown, np.inf, segment + group_cost * (a + b - 2))
+            candidate = cost[:, i - a, :-b] + segment
+            better = candidate < row[:, b:]
+            row[:, b:] = np.where(better, candidate, row[:, b:])
+            row_choice[:, b:] = np.where(better, index, row_choice[:, b:])
+
+        # Release-Track ohne erkannten Track überspringen:
+        # D[j] = min(A[j], D[j-1] + s) = s*j + cummin(A[k] - s*k)
+        skipped = np.minimum.accumulate(row - skip_cost * columns, axis=1) + skip_cost * columns
+        use_skip = skipped < row - 1e-12
+        row = np.where(use_skip, skipped, row)
+        row_choice = np.where(use_skip, SKIP_REFERENCE, row_choice)
+
+        cost[:, i, :] = np.where(valid, row, np.inf)
+        choice[:, i, :] = row_choice
+
+    # Release-Tracks nach dem letzten erkannten Track fehlen
+    release_lengths = np.array(lengths)
+    final = cost[:, n, :] + edge_cost * (release_lengths[:, None] - columns)
+    final = np.where(valid, final, np.inf)
+    ends = np.argmin(final, axis=1)
+
+    results = []
+    for b in range(batch):
+        mapping = _backtrack(choice[b], ends[b], n, d, ref[b], unknown[b], transitions,
+                             tolerance_seconds, tolerance_ratio, unknown_cost, max_cost)
+        total = float(final[b, ends[b]])
+        results.append({
+            "cost": total,
+            "confidence": float(np.mean([entry["confidence"] for entry in mapping])) if mapping else 0.0,
+            "mapping": mapping
+        })
+    return results
+
+def _backtrack(choice, j, n, d, ref, unknown, transitions, tolerance_seconds, tolerance_ratio,
+               unknown_cost, max_cost) -> List[Dict]:
+    """Zuordnung aus der Choice-Matrix eines Releases rekonstruieren"""
+    mapping: List[Optional[Dict]] = [None] * n
+    i = n
+    while i > 0:
+        step = choice[i, j]
+        if step == SKIP_REFERENCE:
+            j -= 1
+            continue
+        if step == SKIP_DETECTED:
+            mapping[i - 1] = {"track": i - 1, "reference": [], "kind": "extra", "confidence": 0.0}
+            i -= 1
+            continue
+        a, b = transitions[step - 2]
+        reference = list(range(j - b, j))
+        if unknown[j - b:j].any():
+            confidence = float(np.exp(-unknown_cost / 2))
+        else:
+            detected_sum = d[i - a:i].sum()
+            reference_sum = ref[j - b:j].sum()
+            error = abs(detected_sum - reference_sum) / (tolerance_seconds + tolerance_ratio * reference_sum)
+            confidence = float(np.exp(-min(error ** 2, max_cost) / 2))
+        kind = "match" if a == b == 1 else ("merge" if b > 1 else "split")
+        if kind != "match":
+            confidence *= 0.8
+        for part, track in enumerate(range(i - a, i)):
+            entry = {"track": track, "reference": reference, "kind": kind, "confidence": round(confidence, 3)}
+            if kind == "split":
+                entry["part"] = part + 1
+            mapping[track] = entry
+        i -= a
+        j -= b
+    return mapping
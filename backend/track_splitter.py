@@ -1,203 +1,567 @@
-import librosa
 import soundfile as sf
 import numpy as np
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
+from audio_stream import write_flac_with_padding, DEFAULT_FLAC_PADDING
+
+# Größere Tracks werden beim Kodieren in eine Temp-Datei ausgelagert statt im RAM gehalten
+ENCODE_SPOOL_BYTES = 128 * 1024 * 1024
+
+def _output_format(source_subtype: str, override=None):
+    """Wähle (dtype, FLAC-Subtype) für die Tracks passend zur Quelle
+
+    16-bit bleibt 16-bit, 24/32-bit wird als 24-bit geschnitten. Float-Quellen
+    (z.B. WAV) werden als 24-bit kodiert, da FLAC keine Floats kennt.
+    """
+    if override == 'PCM_16':
+        return 'int16', 'PCM_16'
+    if override == 'PCM_24':
+        return 'int32', 'PCM_24'
+    if source_subtype in ('PCM_16', 'PCM_S8', 'PCM_U8'):
+        return 'int16', 'PCM_16'
+    if source_subtype in ('PCM_24', 'PCM_32'):
+        return 'int32', 'PCM_24'
+    return 'float32', 'PCM_24'
+
+def _encode_track_range(src_path: str, dst_path: str, start: int, stop: int,
+                        subtype: str, dtype: str = 'int16', padding: int = DEFAULT_FLAC_PADDING,
+                        blocksize: int = 65536):
+    """Kodiere den Sample-Bereich [start, stop) als FLAC (läuft im Kodier-Pool)
+
+    Kodiert wird in einen Puffer (ab ENCODE_SPOOL_BYTES auf Platte), damit die
+    Track-Datei mit Padding für die Tags in einem Durchgang geschrieben wird.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=ENCODE_SPOOL_BYTES, dir=str(Path(dst_path).parent)) as encoded:
+        with sf.SoundFile(src_path) as infile:
+            infile.seek(start)
+            with sf.SoundFile(
+                encoded,
+                mode='w',
+                samplerate=infile.samplerate,
+                channels=infile.channels,
+                format='FLAC',
+                subtype=subtype
+            ) as outfile:
+                for block in infile.blocks(blocksize=blocksize, frames=stop - start, dtype=dtype, always_2d=True):
+                    outfile.write(block)
+        write_flac_with_padding(encoded, Path(dst_path), padding)
+    return dst_path
+
+class RmsEnvelope:
+    """Fortlaufende RMS-Hüllkurve über Blockgrenzen hinweg
+
+    Liefert exakt dieselben Frames wie eine Berechnung über die ganze Datei
+    (zentrierte Frames mit Null-Padding, 1 + Samples // hop Frames) -
+    unabhängig davon, wie das Audio in Blöcke aufgeteilt wird. Frame k ist
+    auf Sample k * hop_length zentriert.
+    """
+
+    def __init__(self, frame_length: int = 2048, hop_length: int = 512):
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        self.frames_emitted = 0
+        self.samples = 0
+        # Linkes Padding, Rest wird zwischen Blöcken aufgehoben
+        self._buffer = np.zeros(frame_length // 2, dtype=np.float32)
+
+    def feed(self, mono: np.ndarray) -> np.ndarray:
+        """Verarbeite Mono-Samples und gib alle jetzt vollständigen Frames zurück"""
+        self.samples += len(mono)
+        self._buffer = np.concatenate((self._buffer, mono.astype(np.float32, copy=False)))
+        return self._emit()
+
+    def finish(self) -> np.ndarray:
+        """Rechtes Padding anhängen und die letzten Frames zurückgeben"""
+        self._buffer = np.concatenate((self._buffer, np.zeros(self.frame_length // 2, dtype=np.float32)))
+        rms = self._emit()
+        self._buffer = self._buffer[:0]
+        return rms
+
+    def _emit(self) -> np.ndarray:
+        count = 1 + (len(self._buffer) - self.frame_length) // self.hop_length
+        if count <= 0:
+            return np.zeros(0, dtype=np.float32)
+        # Quadrate einmal berechnen, Frames als Strided-View ohne Kopie
+        squares = self._buffer.astype(np.float64) ** 2
+        windows = np.lib.stride_tricks.sliding_window_view(squares, self.frame_length)[::self.hop_length][:count]
+        rms = np.sqrt(windows.mean(axis=1)).astype(np.float32)
+        self._buffer = self._buffer[count * self.hop_length:]
+        self.frames_emitted += count
+        return rms
+
+class SilenceDetector:
+    """Findet Split-Punkte fortlaufend aus RMS-Frames
+
+    Die Frames können in beliebigen Stücken nachgeliefert werden. Ein
+    Silence-Bereich wird ausgewertet, sobald ein lauter Frame folgt (oder bei
+    finish()). Referenz für die dB-Schwelle ist reference_peak - bei einer
+    kompletten Hüllkurve deren Maximum. Ohne reference_peak (Live-Analyse)
+    dient der bisherige Spitzenpegel als Referenz; die so gefundenen Punkte
+    sind nur vorläufig.
+    """
+
+    def __init__(self, sr: int, hop_length: int, silence_threshold: float,
+                 min_silence_duration: float, min_track_duration: float, verbose: bool = True,
+                 reference_peak=None):
+        self.sr = sr
+        self.verbose = verbose
+        self.hop_length = hop_length
+        self.silence_threshold = silence_threshold
+        self.min_silence_duration = min_silence_duration
+        self.min_track_duration = min_track_duration
+        self.split_points = [0.0]
+        self.region_count = 0
+        self._frame_offset = 0
+        self.reference_peak = reference_peak
+        self._peak = 0.0
+        self._region_start = None
+        self._region_end = None
+
+    def feed(self, rms: np.ndarray) -> list:
+        """Verarbeite neue RMS-Frames und gib neu gefundene Split-Punkte (Sekunden) zurück"""
+        if len(rms) == 0:
+            return []
+
+        # Konvertiere zu dB relativ zum Maximum (bzw. live zum bisherigen Spitzenpegel)
+        if self.reference_peak is not None:
+            reference = self.reference_peak
+        else:
+            reference = np.maximum.accumulate(np.maximum(rms, self._peak))
+            self._peak = float(reference[-1])
+        # Vergleich in linearer Leistung statt pro Frame zu logarithmieren:
+        # 10*log10(rms²) - 10*log10(ref²) < dB  <=>  rms² < ref² * 10^(dB/10)
+        limit = np.maximum(1e-10, np.square(reference)) * 10.0 ** (self.silence_threshold / 10.0)
+        silence_mask = np.maximum(1e-10, np.square(rms, dtype=np.float64)) < limit
+
+        # Run-Length-Erkennung: Starts/Enden zusammenhängender Silence-Bereiche
+        block_start = self._frame_offset
+        edges = np.diff(np.concatenate(([False], silence_mask, [False])).astype(np.int8))
+        starts = np.flatnonzero(edges == 1) + block_start
+        ends = np.flatnonzero(edges == -1) - 1 + block_start
+        last_index = block_start + len(rms) - 1
+        self._frame_offset += len(rms)
+
+        if self._region_start is not None:
+            if len(starts) and starts[0] == block_start:
+                # Offener Bereich setzt sich im neuen Block fort
+                starts[0] = self._region_start
+            else:
+                # Offener Bereich endete mit dem vorherigen Block
+                starts = np.concatenate(([self._region_start], starts))
+                ends = np.concatenate(([self._region_end], ends))
+            self._region_start = None
+            self._region_end = None
+
+        # Ein Bereich, der bis zum Blockende reicht, bleibt offen
+        if len(ends) and ends[-1] == last_index:
+            self._region_start = int(starts[-1])
+            self._region_end = int(ends[-1])
+            starts = starts[:-1]
+            ends = ends[:-1]
+
+        return self._evaluate_regions(starts, ends)
+
+    def finish(self) -> list:
+        """Werte einen bis zum Ende reichenden Silence-Bereich aus"""
+        if self._region_start is None:
+            return []
+        starts = np.array([self._region_start])
+        ends = np.array([self._region_end])
+        self._region_start = None
+        self._region_end = None
+        return self._evaluate_regions(starts, ends)
+
+    def _evaluate_regions(self, starts: np.ndarray, ends: np.ndarray) -> list:
+        """Prüfe abgeschlossene Silence-Bereiche auf Mindestdauer und Track-Länge"""
+        self.region_count += len(starts)
+        if len(starts) == 0:
+            return []
+
+        start_times = starts * (self.hop_length / self.sr)
+        end_times = ends * (self.hop_length / self.sr)
+        durations = end_times - start_times
+
+        # Nur wenn Stille lang genug ist - Split-Punkt in der Mitte der Stille
+        long_enough = durations >= self.min_silence_duration
+        candidates = (start_times[long_enough] + end_times[long_enough]) / 2
+
+        # Track-Mindestlänge hängt vom jeweils letzten Split ab, betrifft aber nur die wenigen Kandidaten
+        new_points = []
+        for split_point, start_time, end_time, duration in zip(
+            candidates, start_times[long_enough], end_times[long_enough], durations[long_enough]
+        ):
+            if split_point - self.split_points[-1] < self.min_track_duration:
+                continue
+            split_point = float(split_point)
+            self.split_points.append(split_point)
+            new_points.append(split_point)
+            if self.verbose:
+                print(f"  Split-Punkt bei {split_point:.2f}s (Stille: {duration:.2f}s von {start_time:.2f}s bis {end_time:.2f}s)")
+
+        return new_points
+
+class LiveSplitAnalyzer:
+    """Split-Erkennung während der Aufnahme
+
+    Bekommt die aufgenommenen Blöcke, berechnet die Hüllkurve fortlaufend und
+    meldet vorläufige Split-Punkte (relativ zum bisherigen Spitzenpegel). Nach
+    der Aufnahme werden die Punkte gegen das Maximum der ganzen Aufnahme neu
+    bestimmt und die Hüllkurve als Sidecar gespeichert - split_audio kann die
+    Tracks dann ohne erneuten Analyse-Durchlauf schneiden.
+    """
+
+    def __init__(self, splitter: "TrackSplitter", sr: int, channels: int):
+        self.splitter = splitter
+        self.sr = sr
+        self.channels = channels
+        self.envelope = splitter._envelope()
+        self.detector = SilenceDetector(
+            sr, splitter.hop_length, splitter.silence_threshold,
+            splitter.min_silence_duration, splitter.min_track_duration, verbose=False
+        )
+        self._rms_blocks = []
+        self._final_split_points = None
+
+    @property
+    def split_points(self) -> list:
+        """Bisher gefundene Split-Punkte in Sekunden (ohne 0.0) - nach finish() die endgültigen"""
+        if self._final_split_points is not None:
+            return self._final_split_points
+        return self.detector.split_points[1:]
+
+    def feed(self, block: np.ndarray) -> list:
+        """Verarbeite einen Block (frames, channels) und gib neue Split-Punkte zurück"""
+        rms = self.envelope.feed(self.splitter._to_mono(block, self.channels))
+        self._rms_blocks.append(rms)
+        return self.detector.feed(rms)
+
+    def finish(self, audio_path: Path, frames: int) -> list:
+        """Aufnahme beendet: Split-Punkte endgültig bestimmen und Hüllkurve speichern
+
+        Gibt die Split-Punkte zurück, die nicht schon vorläufig gemeldet wurden.
+        """
+        preliminary = set(self.split_points)
+        self._rms_blocks.append(self.envelope.finish())
+        rms = np.concatenate(self._rms_blocks)
+        # Wie split_audio: Referenz ist das Maximum der ganzen Aufnahme
+        self._final_split_points = self.splitter.find_split_points(rms, self.sr, frames)[1:-1]
+        self.splitter.save_envelope(audio_path, rms, self.sr, frames)
+        return [point for point in self._final_split_points if point not in preliminary]
 
 class TrackSplitter:
     def __init__(self):
         self.silence_threshold = -40  # dB
         self.min_silence_duration = 2.0  # Sekunden
         self.min_track_duration = 10.0  # Sekunden
-        
-    def split_audio(self, audio_path: Path, output_dir: Path):
-        """Erkenne Pausen und splitte Audio in Tracks (speichereffizient)"""
+        self.frame_length = 2048
+        self.hop_length = 512
+        self.chunk_seconds = 10.0  # Audio pro gelesenem Block
+        self.cache_dir = None  # None = ".analysis" neben der Aufnahme
+        self.workers = None  # Threads für das Kodieren der Tracks (None = automatisch)
+        self.output_subtype = None  # None = Bittiefe der Quelle, sonst 'PCM_16' / 'PCM_24'
+        self.flac_padding = DEFAULT_FLAC_PADDING  # Reservierter Platz für Tags (Bytes)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _worker_count(self) -> int:
+        if self.workers:
+            return max(1, int(self.workers))
+        return min(4, os.cpu_count() or 1)
+
+    def _encode_pool(self) -> ThreadPoolExecutor:
+        """Gemeinsamer, begrenzter Pool für alle Split-Jobs (wird beim ersten Split erzeugt)
+
+        Threads statt Prozessen: libsndfile (FLAC-Kodierung) und NumPy geben den
+        GIL frei, und ein fork() des Server-Prozesses mit Recorder-, Job- und
+        SQLite-Threads könnte in den Kindern auf fremden Locks hängen bleiben.
+        Gleichzeitige Split-Jobs teilen sich die Worker statt sie zu vervielfachen.
+        """
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self._worker_count(), thread_name_prefix="encode")
+            return self._pool
+
+    def _envelope_path(self, audio_path: Path) -> Path:
+        cache_dir = self.cache_dir or (audio_path.parent / ".analysis")
+        return cache_dir / f"{audio_path.stem}.envelope.npz"
+
+    def save_envelope(self, audio_path: Path, rms: np.ndarray, sr: int, frames: int):
+        """Speichere die RMS-Hüllkurve als float32-Sidecar-Datei
+
+        Volle Genauigkeit, damit Splits aus dem Cache exakt denen einer
+        Neuberechnung entsprechen.
+        """
+        envelope_path = self._envelope_path(audio_path)
+        try:
+            envelope_path.parent.mkdir(parents=True, exist_ok=True)
+            stat = audio_path.stat()
+            # Eigene Temp-Datei pro Thread - gleichzeitige Splits derselben Aufnahme
+            tmp_path = envelope_path.with_name(f"{envelope_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, 'wb') as f:
+                np.savez(
+                    f,
+                    rms=rms.astype(np.float32),
+                    sr=sr,
+                    frames=frames,
+                    hop_length=self.hop_length,
+                    frame_length=self.frame_length,
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns
+                )
+            tmp_path.replace(envelope_path)
+        except Exception as e:
+            print(f"Fehler beim Speichern der Hüllkurve: {e}")
+
+    def load_envelope(self, audio_path: Path):
+        """Lade die Hüllkurve, falls sie zur aktuellen Datei passt (Größe und mtime)"""
+        envelope_path = self._envelope_path(audio_path)
+        if not envelope_path.exists():
+            return None
+        try:
+            stat = audio_path.stat()
+            with np.load(envelope_path) as data:
+                if (int(data["size"]) != stat.st_size
+                        or int(data["mtime_ns"]) != stat.st_mtime_ns
+                        or int(data["hop_length"]) != self.hop_length
+                        or int(data["frame_length"]) != self.frame_length):
+                    return None
+                return {
+                    "rms": data["rms"].astype(np.float32),
+                    "sr": int(data["sr"]),
+                    "frames": int(data["frames"])
+                }
+        except Exception as e:
+            print(f"Fehler beim Laden der Hüllkurve: {e}")
+            return None
+
+    def _block_size(self, sr: int) -> int:
+        """Blockgröße in Samples für ca. chunk_seconds - Vielfaches der Hop-Länge"""
+        return self.hop_length * max(1, int(self.chunk_seconds * sr) // self.hop_length)
+
+    def _envelope(self) -> RmsEnvelope:
+        return RmsEnvelope(self.frame_length, self.hop_length)
+
+    def live_analyzer(self, sr: int, channels: int) -> LiveSplitAnalyzer:
+        """Analyzer für die Split-Erkennung während einer Aufnahme"""
+        return LiveSplitAnalyzer(self, sr, channels)
+
+    def _to_mono(self, block: np.ndarray, channels: int) -> np.ndarray:
+        """Mono-float32-Samples (-1..1) eines Blocks für die RMS-Berechnung"""
+        block_mono = block.mean(axis=1, dtype=np.float32) if channels > 1 else block[:, 0].astype(np.float32)
+        if block.dtype.kind == 'i':
+            # Integer-Samples auf -1..1 normieren (wie soundfile beim Lesen als float)
+            block_mono /= float(np.iinfo(block.dtype).max + 1)
+        return block_mono
+
+    def compute_envelope(self, audio_path: Path, progress_callback=None):
+        """Reine Analyse ohne Schreiben der Tracks - speichert die Hüllkurve als Sidecar"""
+        rms_blocks = []
+        envelope = self._envelope()
+        with sf.SoundFile(str(audio_path)) as infile:
+            sr = infile.samplerate
+            frames = infile.frames
+            for block in infile.blocks(blocksize=self._block_size(sr), dtype='float32', always_2d=True):
+                rms_blocks.append(envelope.feed(self._to_mono(block, infile.channels)))
+                if progress_callback and frames > 0:
+                    progress_callback(infile.tell() / frames)
+        rms_blocks.append(envelope.finish())
+        rms = np.concatenate(rms_blocks)
+        self.save_envelope(audio_path, rms, sr, frames)
+        return {"rms": rms, "sr": sr, "frames": frames}
+
+    def find_split_points(self, rms: np.ndarray, sr: int, frames: int,
+                          silence_threshold=None, min_silence_duration=None, min_track_duration=None):
+        """Berechne Split-Punkte (Sekunden, inkl. Anfang und Ende) aus einer Hüllkurve
+
+        Die dB-Schwelle bezieht sich auf das Maximum der ganzen Hüllkurve.
+        """
+        detector = SilenceDetector(
+            sr,
+            self.hop_length,
+            self.silence_threshold if silence_threshold is None else silence_threshold,
+            self.min_silence_duration if min_silence_duration is None else min_silence_duration,
+            self.min_track_duration if min_track_duration is None else min_track_duration,
+            verbose=False,
+            reference_peak=float(rms.max()) if len(rms) else 0.0
+        )
+        detector.feed(rms)
+        detector.finish()
+        return detector.split_points + [frames / sr]
+
+    def preview_splits(self, audio_path: Path, silence_threshold=None,
+                       min_silence_duration=None, min_track_duration=None):
+        """Vorgeschlagene Tracks für beliebige Parameter - aus dem Cache ohne Audio-Zugriff"""
+        envelope = self.load_envelope(audio_path)
+        cached = envelope is not None
+        if not cached:
+            print(f"Keine Hüllkurve im Cache für {audio_path.name} - analysiere...")
+            envelope = self.compute_envelope(audio_path)
+
+        split_points = self.find_split_points(
+            envelope["rms"], envelope["sr"], envelope["frames"],
+            silence_threshold, min_silence_duration, min_track_duration
+        )
+        tracks = [
+            {
+                "track_number": i + 1,
+                "start_time": split_points[i],
+                "end_time": split_points[i + 1],
+                "duration": split_points[i + 1] - split_points[i]
+            }
+            for i in range(len(split_points) - 1)
+        ]
+        return {"split_points": split_points, "tracks": tracks, "cached": cached}
+
+    def _waveform_path(self, audio_path: Path) -> Path:
+        cache_dir = self.cache_dir or (audio_path.parent / ".analysis")
+        return cache_dir / f"{audio_path.stem}.waveform.json"
+
+    def remove_analysis(self, audio_path: Path):
+        """Lösche Hüllkurve und Waveform einer Audio-Datei (beim Löschen der Datei)"""
+        for path in (self._envelope_path(audio_path), self._waveform_path(audio_path)):
+            try:
+                path.unlink(missing_ok=True)
+            except Exception as e:
+                print(f"Fehler beim Löschen von {path.name}: {e}")
+
+    @staticmethod
+    def _reduce_waveform(rms: np.ndarray, peak: float, points: int) -> list:
+        """Verdichte RMS-Frames auf höchstens `points` Spitzenwerte (0..1)"""
+        if len(rms) == 0:
+            return []
+        count = min(points, len(rms))
+        edges = np.linspace(0, len(rms), count + 1).astype(int)[:-1]
+        peaks = np.maximum.reduceat(rms, edges) / (peak or 1.0)
+        return [round(float(v), 4) for v in peaks]
+
+    def _save_waveform(self, audio_path: Path, peaks: list, duration: float):
+        waveform_path = self._waveform_path(audio_path)
+        try:
+            waveform_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(waveform_path, 'w', encoding='utf-8') as f:
+                json.dump({"duration": duration, "peaks": peaks}, f)
+        except Exception as e:
+            print(f"Fehler beim Speichern der Waveform: {e}")
+
+    def build_waveforms(self, audio_path: Path, tracks: list, output_dir: Path = None, points: int = 800):
+        """Waveform-Daten für Aufnahme und Tracks aus der Hüllkurve der Aufnahme
+
+        Die Tracks werden dafür nicht dekodiert; alle Waveforms sind auf den
+        Spitzenpegel der ganzen Seite normiert und damit vergleichbar.
+        """
+        envelope = self.load_envelope(audio_path) or self.compute_envelope(audio_path)
+        rms, sr = envelope["rms"], envelope["sr"]
+        peak = float(rms.max()) if len(rms) else 1.0
+        frames_per_second = sr / self.hop_length
+
+        self._save_waveform(audio_path, self._reduce_waveform(rms, peak, points), envelope["frames"] / sr)
+        for track in tracks:
+            start = int(round(track["start_time"] * frames_per_second))
+            end = int(round(track["end_time"] * frames_per_second))
+            track_path = (output_dir or audio_path.parent) / track["filename"]
+            self._save_waveform(track_path, self._reduce_waveform(rms[start:end], peak, points), track["duration"])
+
+    def load_waveform(self, audio_path: Path, points: int = 800):
+        """Waveform-Daten einer Datei - aus dem Cache oder aus der Hüllkurve berechnet"""
+        waveform_path = self._waveform_path(audio_path)
+        if waveform_path.exists():
+            try:
+                with open(waveform_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Fehler beim Laden der Waveform: {e}")
+        envelope = self.load_envelope(audio_path) or self.compute_envelope(audio_path)
+        rms = envelope["rms"]
+        peaks = self._reduce_waveform(rms, float(rms.max()) if len(rms) else 1.0, points)
+        duration = envelope["frames"] / envelope["sr"]
+        self._save_waveform(audio_path, peaks, duration)
+        return {"duration": duration, "peaks": peaks}
+
+    def split_audio(self, audio_path: Path, output_dir: Path, progress_callback=None):
+        """Erkenne Pausen und splitte Audio in Tracks
+
+        Die Split-Punkte kommen aus der Hüllkurve der ganzen Aufnahme (dB relativ
+        zu ihrem Maximum). Liegt sie aus der Aufnahme oder einer früheren Analyse
+        im Cache, werden die Tracks direkt geschnitten, sonst wird sie vorher in
+        einem Lesedurchgang berechnet. Die Tracks werden parallel kodiert.
+        progress_callback bekommt den Fortschritt (0.0 - 1.0).
+        """
         print(f"Lade Audio: {audio_path}")
-        
+
         # Prüfe Dateigröße
         file_size_mb = audio_path.stat().st_size / (1024 * 1024)
         print(f"Dateigröße: {file_size_mb:.2f} MB")
-        
-        if file_size_mb > 200:
-            print("Warnung: Große Datei - verwende speichereffiziente Verarbeitung...")
-        
-        try:
-            # Lade Metadaten der Datei
-            with sf.SoundFile(str(audio_path)) as f:
-                sr = f.samplerate
-                channels = f.channels
-                frames = f.frames
-                duration = frames / sr
-                is_stereo = channels == 2
-            
-            print(f"Audio-Info: {channels} Kanäle, {sr} Hz, {duration:.1f}s ({frames} Samples)")
-            
-            # Speichereffiziente RMS-Berechnung in Chunks
-            print("Berechne RMS Energy (speichereffizient)...")
-            frame_length = 2048
-            hop_length = 512
-            chunk_size = 44100 * 10  # 10 Sekunden pro Chunk
-            
-            rms_frames = []
-            total_frames = 0
-            
-            with sf.SoundFile(str(audio_path)) as f:
-                while True:
-                    chunk = f.read(chunk_size, dtype='float32')
-                    if len(chunk) == 0:
-                        break
-                    
-                    # Konvertiere zu Mono für RMS-Berechnung
-                    # soundfile gibt Daten im Format (samples, channels) zurück
-                    if is_stereo:
-                        # Transponiere zu (channels, samples) für librosa.to_mono
-                        chunk_mono = librosa.to_mono(chunk.T)
-                    else:
-                        chunk_mono = chunk.flatten() if len(chunk.shape) > 1 else chunk
-                    
-                    # Berechne RMS für diesen Chunk
-                    chunk_rms = librosa.feature.rms(
-                        y=chunk_mono, 
-                        frame_length=frame_length, 
-                        hop_length=hop_length
-                    )[0]
-                    
-                    rms_frames.append(chunk_rms)
-                    total_frames += len(chunk_mono)
-                    
-                    if len(rms_frames) % 10 == 0:
-                        progress = (f.tell() / frames) * 100
-                        print(f"  Verarbeitet: {progress:.1f}%")
-            
-            # Kombiniere alle RMS-Frames
-            rms = np.concatenate(rms_frames)
-            print(f"RMS-Berechnung abgeschlossen: {len(rms)} Frames")
-            
-        except Exception as e:
-            print(f"Fehler beim Laden der Audio-Datei: {e}")
-            import traceback
-            traceback.print_exc()
-            raise Exception(f"Fehler beim Laden der Audio-Datei: {e}")
-        
-        # Konvertiere zu dB
-        print("Konvertiere zu dB...")
-        rms_db = librosa.power_to_db(rms**2, ref=np.max)
-        
-        # Finde Silence-Bereiche
-        print(f"Suche Silence-Bereiche (Schwelle: {self.silence_threshold} dB, min. Dauer: {self.min_silence_duration}s)...")
-        silence_mask = rms_db < self.silence_threshold
-        
-        # Finde kontinuierliche Silence-Perioden
-        print("Analysiere kontinuierliche Silence-Perioden...")
-        split_points = [0.0]
-        
-        # Finde Start- und Endpunkte von kontinuierlichen Silence-Bereichen
-        silence_indices = np.where(silence_mask)[0]
-        
-        if len(silence_indices) == 0:
-            print("Keine Silence-Bereiche gefunden - erstelle einen einzigen Track")
-            # Verwende duration aus SoundFile
-            with sf.SoundFile(str(audio_path)) as f:
-                total_duration = f.frames / f.samplerate
-            split_points.append(total_duration)
+
+        envelope = self.load_envelope(audio_path)
+        encode_progress = progress_callback
+        if envelope is not None:
+            print("Verwende gecachte Hüllkurve - keine Analyse nötig")
         else:
-            # Finde kontinuierliche Bereiche (wo aufeinanderfolgende Indizes zusammen gehören)
-            silence_regions = []
-            region_start = silence_indices[0]
-            
-            for i in range(1, len(silence_indices)):
-                # Wenn Lücke zwischen Indizes zu groß ist (> 1 Frame), ist es ein neuer Bereich
-                if silence_indices[i] - silence_indices[i-1] > 1:
-                    # Ende des vorherigen Bereichs
-                    region_end = silence_indices[i-1]
-                    silence_regions.append((region_start, region_end))
-                    # Start eines neuen Bereichs
-                    region_start = silence_indices[i]
-            
-            # Füge den letzten Bereich hinzu
-            silence_regions.append((region_start, silence_indices[-1]))
-            
-            print(f"Gefunden: {len(silence_regions)} kontinuierliche Silence-Bereiche")
-            
-            # Konvertiere Frame-Indizes zu Zeitpunkten
-            frame_times = librosa.frames_to_time(
-                np.arange(len(silence_mask)),
-                sr=sr,
-                hop_length=hop_length
-            )
-            
-            # Prüfe jeden Silence-Bereich auf Mindestdauer
-            for region_start_idx, region_end_idx in silence_regions:
-                start_time = frame_times[region_start_idx]
-                end_time = frame_times[region_end_idx]
-                duration = end_time - start_time
-                
-                # Nur wenn Stille lang genug ist
-                if duration >= self.min_silence_duration:
-                    # Split-Punkt in der Mitte der Stille
-                    split_point = (start_time + end_time) / 2
-                    
-                    # Prüfe ob Track lang genug ist
-                    if split_point - split_points[-1] >= self.min_track_duration:
-                        split_points.append(split_point)
-                        print(f"  Split-Punkt bei {split_point:.2f}s (Stille: {duration:.2f}s von {start_time:.2f}s bis {end_time:.2f}s)")
-            
-            # Verwende duration aus SoundFile
-            with sf.SoundFile(str(audio_path)) as f:
-                total_duration = f.frames / f.samplerate
-            split_points.append(total_duration)  # Ende
-        
-        print(f"Gefundene Split-Punkte: {len(split_points)} -> {len(split_points)-1} Tracks")
-        
-        # Erstelle Track-Dateien (speichereffizient)
-        print("Erstelle Track-Dateien...")
-        tracks = []
-        base_name = audio_path.stem
-        
-        for i in range(len(split_points) - 1):
-            start_time = split_points[i]
-            end_time = split_points[i + 1]
-            
-            start_frame = int(start_time * sr)
-            end_frame = int(end_time * sr)
-            
-            print(f"  Track {i+1}: {start_time:.2f}s - {end_time:.2f}s ({end_time-start_time:.2f}s)")
-            
-            track_filename = f"{base_name}_track_{i+1:02d}.flac"
-            track_path = output_dir / track_filename
-            
+            print(f"Analysiere Aufnahme (Schwelle: {self.silence_threshold} dB, min. Dauer: {self.min_silence_duration}s)...")
             try:
-                # Lese nur den benötigten Bereich aus der Datei
-                with sf.SoundFile(str(audio_path)) as infile:
-                    # Setze Position
-                    infile.seek(start_frame)
-                    # Lese nur die benötigten Frames
-                    track_audio = infile.read(end_frame - start_frame, dtype='float32')
-                    
-                    # Speichere Track
-                    sf.write(
-                        str(track_path), 
-                        track_audio, 
-                        sr, 
-                        format='FLAC', 
-                        subtype='PCM_24'
-                    )
-                    
-                    channel_info = "Stereo" if is_stereo else "Mono"
-                    print(f"    Gespeichert: {track_filename} ({channel_info})")
+                envelope = self.compute_envelope(
+                    audio_path, progress_callback=(lambda f: progress_callback(0.4 * f)) if progress_callback else None
+                )
             except Exception as e:
-                print(f"    Fehler beim Speichern von {track_filename}: {e}")
-                import traceback
-                traceback.print_exc()
-                raise
-            
-            tracks.append({
-                "filename": track_filename,
-                "track_number": i + 1,
-                "start_time": start_time,
-                "end_time": end_time,
-                "duration": end_time - start_time
-            })
-        
+                print(f"Fehler beim Splitten der Audio-Datei: {e}")
+                raise Exception(f"Fehler beim Splitten der Audio-Datei: {e}")
+            if progress_callback:
+                encode_progress = lambda f: progress_callback(0.4 + 0.6 * f)
+        return self._encode_tracks(audio_path, output_dir, envelope, encode_progress)
+
+    def _encode_tracks(self, audio_path: Path, output_dir: Path, envelope, progress_callback=None):
+        """Schneide die Tracks anhand der Hüllkurve und kodiere sie parallel"""
+        base_name = audio_path.stem
+        info = sf.info(str(audio_path))
+        sr = info.samplerate
+        workers = self._worker_count()
+        print(f"Audio-Info: {info.channels} Kanäle, {sr} Hz, {info.duration:.1f}s ({info.frames} Samples)")
+        dtype, subtype = _output_format(info.subtype, self.output_subtype)
+        print(f"Kodiere Tracks parallel mit {workers} Threads ({subtype})")
+
+        split_points = self.find_split_points(envelope["rms"], envelope["sr"], envelope["frames"])
+        boundaries = [int(p * sr) for p in split_points[:-1]] + [info.frames]
+
+        pool = self._encode_pool()
+        jobs = []  # (start, stop, future) in Track-Reihenfolge
+        try:
+            for start, stop in zip(boundaries[:-1], boundaries[1:]):
+                track_filename = f"{base_name}_track_{len(jobs) + 1:02d}.flac"
+                future = pool.submit(
+                    _encode_track_range, str(audio_path), str(output_dir / track_filename), start, stop,
+                    subtype, dtype, self.flac_padding
+                )
+                jobs.append((start, stop, future))
+
+            # Ergebnisse in Track-Reihenfolge einsammeln
+            tracks = []
+            for i, (start, stop, future) in enumerate(jobs):
+                future.result()
+                start_time = start / sr
+                end_time = stop / sr
+                tracks.append({
+                    "filename": f"{base_name}_track_{i + 1:02d}.flac",
+                    "track_number": i + 1,
+                    "start_time": start_time,
+                    "end_time": end_time,
+                    "duration": end_time - start_time
+                })
+                print(f"  Track {i + 1}: {start_time:.2f}s - {end_time:.2f}s ({end_time - start_time:.2f}s)")
+                if progress_callback:
+                    progress_callback((i + 1) / len(jobs))
+        except BaseException as e:
+            # Auch bei Job-Abbruch: wartende Kodierungen verwerfen, laufende abschließen lassen
+            for _, _, future in jobs:
+                future.cancel()
+            wait([future for _, _, future in jobs])
+            if isinstance(e, Exception):
+                print(f"Fehler beim Splitten der Audio-Datei: {e}")
+                raise Exception(f"Fehler beim Splitten der Audio-Datei: {e}")
+            raise
+
         print(f"Track-Splitting abgeschlossen: {len(tracks)} Tracks erstellt")
         return tracks
-
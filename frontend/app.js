@@ -17,6 +17,7 @@ let currentAudioPlayer = null;
 let isRecording = false;
 let recordingFilename = null;
 let statusCheckInterval = null;
+let liveSplitPoints = [];  // Vorläufige Track-Grenzen der laufenden Aufnahme (Sekunden)
 
 // Tab-Navigation
 function initTabs() {
@@ -90,6 +91,11 @@ function connectWebSocket() {
             updateLevelBar(data.value);
             // Waveform immer aktualisieren wenn Level-Daten kommen
             updateWaveform(data.value);
+        } else if (data.type === 'job') {
+            handleJobEvent(data.job);
+        } else if (data.type === 'split_point') {
+            liveSplitPoints[data.index] = data.time;
+            updateSplitStatus();
         }
     };
     
@@ -107,6 +113,65 @@ function connectWebSocket() {
     };
 }
 
+// Hintergrund-Jobs: Fortschritt kommt per WebSocket, Polling als Fallback
+const jobListeners = {};
+
+function handleJobEvent(job) {
+    const listener = jobListeners[job.id];
+    if (listener) {
+        listener(job);
+    } else if (job.kind === 'finalize' && (job.state === 'queued' || job.state === 'running')) {
+        // Nicht hier gestartet (Auto-Stop nach Stille oder anderer Tab)
+        followFinalizeJob(job.id).catch((error) => {
+            alert('Fehler beim Speichern der Aufnahme: ' + error.message);
+        });
+    }
+}
+
+function waitForJob(jobId, onProgress) {
+    return new Promise((resolve, reject) => {
+        let pollInterval = null;
+        const finish = (error, job) => {
+            delete jobListeners[jobId];
+            clearInterval(pollInterval);
+            if (error) {
+                reject(error);
+            } else {
+                resolve(job);
+            }
+        };
+        const update = (job) => {
+            if (onProgress) {
+                onProgress(job);
+            }
+            if (job.state === 'done') {
+                finish(null, job);
+            } else if (job.state === 'failed') {
+                finish(new Error(job.error || 'Job fehlgeschlagen'));
+            } else if (job.state === 'cancelled') {
+                finish(new Error('Job abgebrochen'));
+            }
+        };
+        jobListeners[jobId] = update;
+        pollInterval = setInterval(async () => {
+            try {
+                const response = await fetch(`${API_BASE}/jobs/${jobId}`);
+                if (!jobListeners[jobId]) {
+                    return;
+                }
+                if (response.ok) {
+                    update(await response.json());
+                } else {
+                    // 404: Job wurde bereits aus der Liste entfernt
+                    finish(new Error(response.status === 404 ? 'Job nicht mehr vorhanden' : `Job-Status nicht abrufbar (HTTP ${response.status})`));
+                }
+            } catch (error) {
+                console.error('Fehler beim Abfragen des Jobs:', error);
+            }
+        }, 1000);
+    });
+}
+
 function updateLevelBar(level) {
     const percentage = Math.min(level * 100, 100);
     const levelBar = document.getElementById('levelBar');
@@ -225,6 +290,21 @@ function drawWaveform() {
     waveformCtx.stroke();
 }
 
+// Zeige vorläufige Track-Grenzen im Aufnahme-Status
+function updateSplitStatus() {
+    const splitStatus = document.getElementById('splitStatus');
+    if (!splitStatus) return;
+    const points = liveSplitPoints.filter(p => p !== undefined);
+    if (!isRecording || points.length === 0) {
+        splitStatus.textContent = '';
+        return;
+    }
+    const last = points[points.length - 1];
+    const minutes = Math.floor(last / 60);
+    const seconds = Math.floor(last % 60).toString().padStart(2, '0');
+    splitStatus.textContent = `✂️ ${points.length} Track-Grenze(n) erkannt - zuletzt bei ${minutes}:${seconds}`;
+}
+
 // Update UI basierend auf Aufnahme-Status
 function updateRecordingUI(status) {
     const startBtn = document.getElementById('startBtn');
@@ -234,6 +314,12 @@ function updateRecordingUI(status) {
     const wasRecording = isRecording;
     isRecording = status.recording || false;
     recordingFilename = status.recording_filename || null;
+    if (status.split_points && status.split_points.length >= liveSplitPoints.length) {
+        liveSplitPoints = status.split_points.slice();
+    } else if (!isRecording) {
+        liveSplitPoints = [];
+    }
+    updateSplitStatus();
     
     if (isRecording) {
         // Aufnahme läuft: Start-Button ausblenden, Stop-Button aktivieren
@@ -312,6 +398,46 @@ document.getElementById('startBtn').addEventListener('click', async () => {
     }
 });
 
+// Finalisierung (und ggf. automatisches Splitten) einer gestoppten Aufnahme verfolgen
+const followedFinalizeJobs = new Set();
+
+async function followFinalizeJob(jobId) {
+    // WebSocket-Event und Antwort des Stopp-Buttons können sich überholen
+    if (followedFinalizeJobs.has(jobId)) {
+        return;
+    }
+    followedFinalizeJobs.add(jobId);
+    // UI wird durch checkRecordingStatus aktualisiert
+    await checkRecordingStatus();
+    const recordingStatus = document.getElementById('recordingStatus');
+    recordingStatus.textContent = '💾 Speichere Aufnahme...';
+    recordingStatus.className = 'text-center text-yellow-400 text-lg font-semibold';
+    
+    // FLAC-Finalisierung läuft im Hintergrund
+    const job = await waitForJob(jobId, (job) => {
+        recordingStatus.textContent = `💾 Speichere Aufnahme... ${job.progress.toFixed(0)}%`;
+    });
+    recordingStatus.textContent = `✅ Aufnahme gespeichert: ${job.result.filename}`;
+    recordingStatus.className = 'text-center text-green-400 text-lg font-semibold';
+    loadRecordings();
+    
+    // Automatisches Splitten (recording.auto_split) läuft direkt im Anschluss
+    if (job.result.pipeline_job_id) {
+        recordingStatus.textContent = '✂️ Splitte Tracks...';
+        recordingStatus.className = 'text-center text-yellow-400 text-lg font-semibold';
+        const pipeline = await waitForJob(job.result.pipeline_job_id, (pipelineJob) => {
+            recordingStatus.textContent = `✂️ Splitte Tracks... ${pipelineJob.progress.toFixed(0)}%`;
+        });
+        const trackCount = (pipeline.result.tracks || []).length;
+        recordingStatus.textContent = pipeline.result.tagging
+            ? `✅ ${trackCount} Tracks erstellt und getaggt: ${pipeline.result.tagging.artist} - ${pipeline.result.tagging.album}`
+            : `✅ ${trackCount} Tracks erstellt`;
+        recordingStatus.className = 'text-center text-green-400 text-lg font-semibold';
+        loadRecordings();
+        loadAlbums();
+    }
+}
+
 // Aufnahme stoppen
 document.getElementById('stopBtn').addEventListener('click', async () => {
     try {
@@ -319,11 +445,7 @@ document.getElementById('stopBtn').addEventListener('click', async () => {
         const data = await response.json();
         
         if (response.ok) {
-            // UI wird durch checkRecordingStatus aktualisiert
-            await checkRecordingStatus();
-            document.getElementById('recordingStatus').textContent = `✅ Aufnahme gespeichert: ${data.filename}`;
-            document.getElementById('recordingStatus').className = 'text-center text-green-400 text-lg font-semibold';
-            loadRecordings();
+            await followFinalizeJob(data.job_id);
         } else {
             alert('Fehler: ' + data.error);
         }
@@ -427,23 +549,22 @@ document.getElementById('splitBtn').addEventListener('click', async () => {
         splitBtn.disabled = true;
         splitBtn.textContent = '⏳ Verarbeitung... (dies kann bei großen Dateien einige Minuten dauern)';
         
-        const controller = new AbortController();
-        const timeoutId = setTimeout(() => controller.abort(), 600000);
-        
         const response = await fetch(`${API_BASE}/split-tracks`, {
             method: 'POST',
-            body: formData,
-            signal: controller.signal
+            body: formData
         });
         
-        clearTimeout(timeoutId);
-        
         if (!response.ok) {
             const errorData = await response.json().catch(() => ({ error: 'Unbekannter Fehler' }));
             throw new Error(errorData.error || `HTTP ${response.status}`);
         }
         
-        const data = await response.json();
+        // Splitting läuft als Hintergrund-Job
+        const queued = await response.json();
+        const job = await waitForJob(queued.job_id, (job) => {
+            splitBtn.textContent = `⏳ Verarbeitung... ${job.progress.toFixed(0)}%`;
+        });
+        const data = job.result;
         
         if (data.tracks && data.tracks.length > 0) {
             displayTracks(data.tracks);
@@ -456,11 +577,7 @@ document.getElementById('splitBtn').addEventListener('click', async () => {
         }
         
     } catch (error) {
-        if (error.name === 'AbortError') {
-            alert('Verarbeitung dauerte zu lange (Timeout nach 10 Minuten).');
-        } else {
-            alert('Fehler beim Splitting: ' + error.message);
-        }
+        alert('Fehler beim Splitting: ' + error.message);
         splitBtn.textContent = originalText;
     } finally {
         splitBtn.disabled = false;
@@ -621,6 +738,8 @@ document.getElementById('downloadCollectionBtn').addEventListener('click', async
 });
 
 // Album-Suche
+let albumDetailsSource = null;
+
 document.getElementById('searchAlbumForm').addEventListener('submit', async (e) => {
     e.preventDefault();
     
@@ -628,6 +747,12 @@ document.getElementById('searchAlbumForm').addEventListener('submit', async (e)
     const album = document.getElementById('searchAlbum').value;
     const resultsDiv = document.getElementById('albumSearchResults');
     
+    // Details einer vorherigen Suche nicht mehr empfangen
+    if (albumDetailsSource) {
+        albumDetailsSource.close();
+        albumDetailsSource = null;
+    }
+    
     resultsDiv.innerHTML = '<p class="text-white text-center py-4">🔍 Suche...</p>';
     
     try {
@@ -644,6 +769,9 @@ document.getElementById('searchAlbumForm').addEventListener('submit', async (e)
         
         if (response.ok && data.releases && data.releases.length > 0) {
             displayAlbumSearchResults(data.releases, artist, album);
+            if (data.details_pending) {
+                streamAlbumDetails(data.releases);
+            }
         } else {
             resultsDiv.innerHTML = '<p class="text-red-400 text-center py-4">Keine Alben gefunden. Versuche andere Suchbegriffe.</p>';
         }
@@ -652,64 +780,151 @@ document.getElementById('searchAlbumForm').addEventListener('submit', async (e)
     }
 });
 
+function streamAlbumDetails(releases) {
+    // Details (Media, Track-Längen, Cover) kommen per Server-Sent Events nach
+    const params = new URLSearchParams({ mbids: releases.map(r => r.mbid).join(',') });
+    const filename = document.getElementById('recordingSelect').value;
+    if (filename) {
+        // Releases werden per Duration-Alignment gegen die Tracks der Aufnahme bewertet
+        params.append('base_filename', filename);
+    }
+    
+    const source = new EventSource(`${API_BASE}/search-album/details?${params}`);
+    albumDetailsSource = source;
+    
+    source.addEventListener('release', (event) => {
+        const detail = JSON.parse(event.data);
+        const release = releases.find(r => r.mbid === detail.mbid);
+        if (!release) {
+            return;
+        }
+        if (detail.error) {
+            release.details_failed = true;
+        } else {
+            Object.assign(release, detail);
+        }
+        release.details_loaded = true;
+        
+        const card = document.getElementById(`release-${release.mbid}`);
+        if (card) {
+            card.replaceWith(renderAlbumSearchResult(release));
+        }
+        sortAlbumSearchResults(releases);
+    });
+    
+    source.addEventListener('ranking', (event) => {
+        // Bewertung aller bisher geladenen Releases (ein gemeinsamer Alignment-Durchgang)
+        JSON.parse(event.data).forEach((entry) => {
+            const release = releases.find(r => r.mbid === entry.mbid);
+            if (release && entry.score !== null) {
+                release.score = entry.score;
+            }
+        });
+        sortAlbumSearchResults(releases);
+    });
+    
+    source.addEventListener('done', () => {
+        source.close();
+        if (albumDetailsSource === source) {
+            albumDetailsSource = null;
+        }
+    });
+    
+    source.onerror = () => {
+        source.close();
+    };
+}
+
+function sortAlbumSearchResults(releases) {
+    // Nach Match-Score ordnen, sobald einer vorliegt - sonst Reihenfolge der Suche
+    const resultsDiv = document.getElementById('albumSearchResults');
+    const ordered = releases
+        .map((release, index) => ({ release, index }))
+        .sort((a, b) => ((b.release.score ?? -1) - (a.release.score ?? -1)) || (a.index - b.index));
+    ordered.forEach(({ release }) => {
+        const card = document.getElementById(`release-${release.mbid}`);
+        if (card) {
+            resultsDiv.appendChild(card);
+        }
+    });
+}
+
 function displayAlbumSearchResults(releases, searchArtist, searchAlbum) {
     const resultsDiv = document.getElementById('albumSearchResults');
     resultsDiv.innerHTML = '';
     
     releases.forEach((release) => {
-        const totalTracks = release.total_tracks_all_media || release.track_count || 0;
-        const mediaCount = release.media_count || release.media?.length || 0;
-        const discCount = release.disc_count || Math.ceil(mediaCount / 2) || 1;
-        
-        let mediaInfo = '';
         if (release.media && release.media.length > 0) {
-            const mediaGroups = [];
-            for (let i = 0; i < release.media.length; i += 2) {
-                const discNum = Math.floor(i / 2) + 1;
-                const sideA = release.media[i];
-                const sideB = release.media[i + 1];
-                
-                if (sideB) {
-                    mediaGroups.push(`Platte ${discNum}: Seite ${sideA.position} (${sideA.track_count} Tracks) + Seite ${sideB.position} (${sideB.track_count} Tracks)`);
-                } else {
-                    mediaGroups.push(`Platte ${discNum}: Seite ${sideA.position} (${sideA.track_count} Tracks)`);
-                }
+            release.details_loaded = true;
+        }
+        resultsDiv.appendChild(renderAlbumSearchResult(release));
+    });
+}
+
+function renderAlbumSearchResult(release) {
+    const totalTracks = release.total_tracks_all_media || release.track_count || 0;
+    const mediaCount = release.media_count || release.media?.length || 0;
+    const discCount = release.disc_count || Math.ceil(mediaCount / 2) || 1;
+    
+    let mediaInfo = '';
+    if (release.media && release.media.length > 0) {
+        const mediaGroups = [];
+        for (let i = 0; i < release.media.length; i += 2) {
+            const discNum = Math.floor(i / 2) + 1;
+            const sideA = release.media[i];
+            const sideB = release.media[i + 1];
+            
+            if (sideB) {
+                mediaGroups.push(`Platte ${discNum}: Seite ${sideA.position} (${sideA.track_count} Tracks) + Seite ${sideB.position} (${sideB.track_count} Tracks)`);
+            } else {
+                mediaGroups.push(`Platte ${discNum}: Seite ${sideA.position} (${sideA.track_count} Tracks)`);
             }
-            mediaInfo = mediaGroups.join('<br>');
-        } else {
-            mediaInfo = `${totalTracks} Tracks gesamt`;
         }
-        
-        const coverImg = release.cover_url ? 
-            `<img src="${release.cover_url}" alt="Cover" class="w-32 h-32 object-cover rounded-lg">` : 
-            '<div class="w-32 h-32 bg-gray-700 rounded-lg flex items-center justify-center text-gray-400">Kein Cover</div>';
-        
-        const discInfo = discCount > 1 ? `<span class="text-yellow-400 font-semibold">${discCount} Platten</span> • ` : '';
-        
-        const div = document.createElement('div');
-        div.className = 'glass-effect rounded-xl p-4 border border-white/10 mb-3';
-        div.innerHTML = `
-            <div class="flex gap-4">
-                <div class="flex-shrink-0">
-                    ${coverImg}
-                </div>
-                <div class="flex-1">
-                    <h3 class="text-white font-bold text-lg">${release.title}</h3>
-                    <p class="text-gray-300">${release.artist}</p>
-                    <p class="text-gray-400 text-sm mt-2">
-                        ${release.date ? 'Jahr: ' + release.date + ' • ' : ''}
-                        ${discInfo}${totalTracks} Tracks gesamt (${mediaCount} Seiten)<br>
-                        <span class="text-gray-500 text-xs mt-1 block">${mediaInfo}</span>
-                    </p>
-                    <button onclick='selectAlbum("${release.mbid}", ${JSON.stringify(release.title)}, ${totalTracks})' 
-                            class="mt-3 bg-purple-600 hover:bg-purple-700 text-white px-4 py-2 rounded-lg transition-all">
-                        ✅ Dieses Album verwenden
-                    </button>
-                </div>
+        mediaInfo = mediaGroups.join('<br>');
+    } else if (!release.details_loaded) {
+        mediaInfo = '⏳ Lade Details...';
+    } else if (release.details_failed) {
+        mediaInfo = 'Details nicht verfügbar';
+    } else {
+        mediaInfo = `${totalTracks} Tracks gesamt`;
+    }
+    
+    let coverImg;
+    if (release.cover_url) {
+        coverImg = `<img src="${release.cover_url}" alt="Cover" class="w-32 h-32 object-cover rounded-lg">`;
+    } else if (!release.details_loaded) {
+        coverImg = '<div class="w-32 h-32 bg-gray-700 rounded-lg flex items-center justify-center text-gray-400 animate-pulse">⏳</div>';
+    } else {
+        coverImg = '<div class="w-32 h-32 bg-gray-700 rounded-lg flex items-center justify-center text-gray-400">Kein Cover</div>';
+    }
+    
+    const discInfo = discCount > 1 ? `<span class="text-yellow-400 font-semibold">${discCount} Platten</span> • ` : '';
+    const scoreInfo = release.score != null ? ` • Übereinstimmung: ${release.score}%` : '';
+    
+    const div = document.createElement('div');
+    div.id = `release-${release.mbid}`;
+    div.className = 'glass-effect rounded-xl p-4 border border-white/10 mb-3';
+    div.innerHTML = `
+        <div class="flex gap-4">
+            <div class="flex-shrink-0">
+                ${coverImg}
             </div>
-        `;
-        resultsDiv.appendChild(div);
-    });
+            <div class="flex-1">
+                <h3 class="text-white font-bold text-lg">${release.title}</h3>
+                <p class="text-gray-300">${release.artist}</p>
+                <p class="text-gray-400 text-sm mt-2">
+                    ${release.date ? 'Jahr: ' + release.date + ' • ' : ''}
+                    ${discInfo}${totalTracks} Tracks gesamt (${mediaCount} Seiten)${scoreInfo}<br>
+                    <span class="text-gray-500 text-xs mt-1 block">${mediaInfo}</span>
+                </p>
+                <button onclick='selectAlbum("${release.mbid}", ${JSON.stringify(release.title)}, ${totalTracks})' 
+                        class="mt-3 bg-purple-600 hover:bg-purple-700 text-white px-4 py-2 rounded-lg transition-all">
+                    ✅ Dieses Album verwenden
+                </button>
+            </div>
+        </div>
+    `;
+    return div;
 }
 
 async function selectAlbum(mbid, albumTitle, trackCount) {
@@ -721,8 +936,6 @@ async function selectAlbum(mbid, albumTitle, trackCount) {
         return;
     }
     
-    const tracksPerSide = document.getElementById('tracksPerSide').value;
-    
     if (!confirm(`Metadaten von "${albumTitle}" auf alle Tracks anwenden?`)) {
         return;
     }
@@ -731,23 +944,23 @@ async function selectAlbum(mbid, albumTitle, trackCount) {
         const formData = new FormData();
         formData.append('base_filename', filename);
         formData.append('release_mbid', mbid);
-        if (tracksPerSide) {
-            formData.append('tracks_per_side', tracksPerSide);
-        }
         
         const response = await fetch(`${API_BASE}/auto-tag-album`, {
             method: 'POST',
             body: formData
         });
         
-        const data = await response.json();
+        const queued = await response.json();
         
         if (response.ok) {
+            // Tagging läuft als Hintergrund-Job
+            const job = await waitForJob(queued.job_id);
+            const data = job.result;
             alert(`✅ ${data.tagged_tracks} Tracks wurden erfolgreich getaggt!\nAlbum: ${data.album}\nInterpret: ${data.artist}`);
             loadRecordings();
             loadAlbums();
         } else {
-            alert('Fehler: ' + data.error);
+            alert('Fehler: ' + queued.error);
         }
     } catch (error) {
         alert('Fehler beim Tagging: ' + error.message);